@@ -1,50 +1,51 @@
-import streamlit as st
-from supabase import create_client, Client
 import time
+_inicio = time.perf_counter()
+import streamlit as st
 from datetime import datetime, timedelta
-import io
-import requests
-import csv
-import pandas as pd
-from PIL import Image
+import os
+import json
 import extra_streamlit_components as stx
-import hashlib
 import html
-
-# Tenta importar a biblioteca de copiar. Se falhar, avisa o usuário.
-try:
-    from st_copy_to_clipboard import st_copy_to_clipboard
-except ImportError:
-    st.error("⚠️ Biblioteca 'st-copy-to-clipboard' não encontrada. Adicione-a ao requirements.txt.")
-    st.stop()
+from banco import criar_cliente
+from busca import IndiceBusca
+from corpus import CorpusSincronizado
+from snapshot import ARQUIVO_SNAPSHOT
+from auditoria import RegistroAuditoria
+from autenticacao import ITERACOES, ORCAMENTO_MS, Autenticador, gerar_hash
+from desempenho import MONITOR
+from modelos import FORMATOS_LOTE, compilar, gerar_lote
+from copiar import botao_copiar
+from uso import RegistroUso, decair
+# importacao (pandas/openpyxl), backup (pyarrow) e similaridade (numpy) são
+# importados só nas telas que os usam, para não pesar no cold start.
+
+_rerun = MONITOR.iniciar_rerun()
+MONITOR.marcar_inicio("imports", _inicio)
 
 # ==============================================================================
 # 1. CONFIGURAÇÕES E INICIALIZAÇÃO
 # ==============================================================================
-FAVICON_URL = "https://urmwvabkikftsefztadb.supabase.co/storage/v1/object/public/imagens/favicon.png"
+_etapa = time.perf_counter()
+# Favicon e logo são lidos de static/ quando estiverem lá. Sem eles, o favicon vira emoji e o logo
+# vem da URL remota, que o navegador busca sozinho (o servidor não espera).
+PASTA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+FAVICON = os.path.join(PASTA_STATIC, "favicon.png")
+LOGO = os.path.join(PASTA_STATIC, "logo_gupy.png")
 LOGO_URL = "https://urmwvabkikftsefztadb.supabase.co/storage/v1/object/public/imagens/logo_gupy.png.png"
+TAMANHOS_PAGINA = [8, 16, 24, 48]
+TAMANHO_MANUTENCAO = 20
+ORDENS = {"⭐ Mais usadas": True, "🕒 Mais recentes": False}
 
-@st.cache_data
-def carregar_favicon(url):
-    try:
-        response = requests.get(url, timeout=2)
-        if response.status_code == 200:
-            return Image.open(io.BytesIO(response.content))
-    except Exception:
-        return "💙"
-    return "💙"
+if not os.path.exists(LOGO): LOGO = LOGO_URL
 
-favicon = carregar_favicon(FAVICON_URL)
-st.set_page_config(page_title="Gupy Frases", page_icon=favicon, layout="wide")
+st.set_page_config(page_title="Gupy Frases", page_icon=FAVICON if os.path.exists(FAVICON) else "💙", layout="wide")
 
 # ==============================================================================
 # 2. ESTILO CSS (VISUAL LIMPO E SEGURO)
 # ==============================================================================
 st.markdown("""
 <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
-    
-    html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
+    html, body, [class*="css"] { font-family: 'Inter', -apple-system, 'Segoe UI', Roboto, sans-serif; }
     .block-container { padding-top: 1.5rem !important; }
     header { visibility: hidden; }
     
@@ -114,14 +115,23 @@ st.markdown("""
     .footer { text-align: center; color: #CCC; font-size: 0.8rem; margin-top: 50px; border-top: 1px solid #EEE; padding-top: 20px; }
 </style>
 """, unsafe_allow_html=True)
+MONITOR.marcar_inicio("configuracao", _etapa)
 
 # ==============================================================================
 # 3. GERENCIAMENTO DE DADOS
 # ==============================================================================
+@st.cache_resource
+def obter_cliente():
+    return criar_cliente(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], monitor=MONITOR)
+
 try:
-    url_db = st.secrets["SUPABASE_URL"]
-    key_db = st.secrets["SUPABASE_KEY"]
-    supabase: Client = create_client(url_db, key_db)
+    _etapa = time.perf_counter()
+    supabase = obter_cliente()
+    MONITOR.marcar_inicio("cliente_supabase", _etapa)
+    # Mesmo padrão de similaridade.LIMIAR_PADRAO, sem importar o numpy na abertura.
+    LIMIAR_SIMILARIDADE = float(st.secrets.get("LIMIAR_SIMILARIDADE", 0.8))
+    # Chave dos tokens de sessão: segredo próprio, nunca a chave do Supabase (que é pública).
+    if not st.secrets.get("AUTH_SECRET"): raise RuntimeError("defina AUTH_SECRET em secrets.toml (ex.: python -c \"import secrets; print(secrets.token_urlsafe(32))\")")
 except Exception as e:
     st.error(f"Erro crítico de configuração: {e}")
     st.stop()
@@ -133,64 +143,100 @@ def padronizar(texto):
 def gerar_assinatura(e, m, c):
     return f"{padronizar(e).lower()}|{padronizar(m).lower()}|{padronizar(c).lower()}"
 
-def converter_para_csv(dados):
-    if not dados: return ""
-    output = io.StringIO()
-    if len(dados) > 0:
-        writer = csv.DictWriter(output, fieldnames=dados[0].keys())
-        writer.writeheader()
-        writer.writerows(dados)
-    return output.getvalue()
-
 # --- Funções de Banco de Dados ---
+@st.cache_resource
+def obter_autenticador():
+    return Autenticador(supabase, st.secrets["AUTH_SECRET"], iteracoes=int(st.secrets.get("AUTH_ITERACOES", ITERACOES)), monitor=MONITOR)
+
 def verificar_login(u, s):
-    try:
-        res = supabase.table("usuarios").select("*").eq("username", u).execute()
-        if res.data:
-            user = res.data[0]
-            if user['senha'] == s: 
-                return user
-        return None
+    try: return obter_autenticador().login(u, s)
     except Exception: return None
 
-def recuperar_usuario_cookie(username):
-    try:
-        res = supabase.table("usuarios").select("*").eq("username", username).execute()
-        return res.data[0] if res.data else None
+def recuperar_usuario_cookie(token):
+    try: return obter_autenticador().usuario_do_token(token)
     except Exception: return None
 
+@st.cache_resource
+def obter_auditoria():
+    return RegistroAuditoria(supabase)
+
 def registrar_log(usuario, acao, detalhe):
-    try:
-        supabase.table("logs").insert({
-            "usuario": usuario, "acao": acao, "detalhe": detalhe, 
-            "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }).execute()
-    except Exception: pass
+    obter_auditoria().registrar({
+        "usuario": usuario, "acao": acao, "detalhe": detalhe, 
+        "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
 
 # --- Funções de Busca Inteligente ---
-@st.cache_data(ttl=300)
-def obter_dataframe_filtros():
-    try:
-        res = supabase.table("frases").select("id, empresa, documento, motivo, conteudo").execute()
-        df = pd.DataFrame(res.data)
-        return df
+@st.cache_resource
+def obter_corpus():
+    return CorpusSincronizado(supabase, arquivo_snapshot=ARQUIVO_SNAPSHOT)
+
+def obter_indice_busca():
+    corpus = obter_corpus()
+    ultima = corpus.ultima_sync
+    inicio = time.perf_counter()
+    try: corpus.sincronizar()
     except Exception:
-        return pd.DataFrame()
+        if not corpus.versao: raise
+    MONITOR.marcar_inicio("carga_corpus", inicio)
+    # O índice de quase duplicados (segundos em corpus grandes) fica pronto em segundo plano,
+    # antes do primeiro "Salvar Frase" ou importação precisar dele.
+    corpus.preparar_similaridade()
+    MONITOR.contar_cache("corpus", acerto=corpus.ultima_sync == ultima)
+    return corpus.indice
+
+@st.cache_resource
+def obter_uso():
+    return RegistroUso(supabase)
+
+def popularidade():
+    uso = obter_uso()
+    try: uso.sincronizar()
+    except Exception: pass
+    return uso.pontuacao
+
+def avisar(mensagem):
+    """Guarda um aviso para exibir depois do st.rerun(), que apagaria um toast imediato."""
+    st.session_state["aviso"] = mensagem
 
-def buscar_frases_final(termo=None, empresa_filtro="Todas", doc_filtro="Todos"):
-    query = supabase.table("frases").select("*").order("id", desc=True)
+def atualizar_corpus():
+    try: obter_corpus().sincronizar(forcar=True)
+    except Exception: pass
+
+def buscar_frases_final(termo=None, empresa_filtro="Todas", doc_filtro="Todos", limite=8, apos=None, popularidade=None):
+    try: indice = obter_indice_busca()
+    except Exception: return [], 0, None
+    return indice.pagina(termo, empresa_filtro, doc_filtro, limite, apos, popularidade)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def buscar_manutencao(termo, apos, versao, limite=TAMANHO_MANUTENCAO):
+    """Uma página da busca da Manutenção, do id mais novo para o mais antigo.
+    `versao` (do corpus) entra na chave do cache para descartá-lo depois de uma edição."""
+    query = supabase.table("frases").select("*").order("id", desc=True).limit(limite + 1)
     if termo:
-        filtro = f"conteudo.ilike.%{termo}%,empresa.ilike.%{termo}%,motivo.ilike.%{termo}%"
-        query = query.or_(filtro)
-    if empresa_filtro != "Todas": query = query.eq("empresa", empresa_filtro)
-    if doc_filtro != "Todos": query = query.eq("documento", doc_filtro)
-    return query.limit(50 if termo else 8).execute().data or []
+        t = termo.translate(str.maketrans(",()", "   "))
+        query = query.or_(f"empresa.ilike.%{t}%,motivo.ilike.%{t}%")
+    if apos is not None: query = query.lt("id", apos)
+    dados = query.execute().data
+    return dados[:limite], (dados[limite - 1]["id"] if len(dados) > limite else None)
+
+def frase_por_id(id_frase):
+    frase = obter_corpus().indice.frases.get(id_frase)
+    if frase is None:
+        res = supabase.table("frases").select("*").eq("id", id_frase).execute().data
+        frase = res[0] if res else None
+    return frase
 
 # ==============================================================================
 # 4. COMPONENTES VISUAIS (USANDO CLASSE CSS)
 # ==============================================================================
 
+@MONITOR.cronometrar()
 def card_frase(frase):
+    # Visualização conta uma vez por sessão; cópia conta a cada clique.
+    vistas = st.session_state.setdefault("frases_vistas", set())
+    if frase['id'] not in vistas:
+        vistas.add(frase['id']); obter_uso().registrar(frase['id'], "visualizacao")
     with st.container(border=True):
         c_head1, c_head2 = st.columns([4, 1])
         with c_head1:
@@ -211,23 +257,88 @@ def card_frase(frase):
         # --- RODAPÉ ---
         c_footer1, c_footer2 = st.columns([3, 1], vertical_alignment="center")
         
+        copias = obter_uso().contagens.get(frase['id'], (0, 0))[0]
         with c_footer1:
             st.markdown(f"""
             <div style='font-size:0.75rem; color:#888;'>
-                ✍️ {frase.get('revisado_por', 'Sistema')} | 📅 {frase.get('data_revisao', '-')}
+                ✍️ {frase.get('revisado_por', 'Sistema')} | 📅 {frase.get('data_revisao', '-')}{f" | 📋 {copias}" if copias else ""}
             </div>
             """, unsafe_allow_html=True)
             
         with c_footer2:
-            st_copy_to_clipboard(frase['conteudo'], "📋 Copiar", key=f"cp_{frase['id']}")
+            if botao_copiar(frase['conteudo'], "📋 Copiar", key=f"cp_{frase['id']}"):
+                obter_uso().registrar(frase['id'], "copia")
+
+        modelo = compilar(frase['conteudo'])
+        if modelo.tem_campos:
+            with st.popover("✨ Personalizar", use_container_width=True):
+                valores = {c: st.text_input(c.capitalize(), value=frase['empresa'] if c == "empresa" else "", key=f"pz_{frase['id']}_{c}")
+                           for c in dict.fromkeys(modelo.campos)}
+                texto = modelo.renderizar(valores)
+                st.markdown(f'<div class="frase-box">{html.escape(texto)}</div>', unsafe_allow_html=True)
+                if botao_copiar(texto, "📋 Copiar personalizada", key=f"cpp_{frase['id']}"):
+                    obter_uso().registrar(frase['id'], "copia")
 
 # ==============================================================================
 # 5. TELAS DO SISTEMA
 # ==============================================================================
 
+@MONITOR.cronometrar()
 def tela_biblioteca(user):
     st.markdown("### 📂 Biblioteca de Modelos")
-    df_filtros = obter_dataframe_filtros()
+    tab_frases, tab_populares, tab_lote = st.tabs(["📚 Frases", "🔥 Mais usadas", "📨 Mensagens em lote"])
+    with tab_frases: painel_biblioteca()
+    with tab_populares: painel_mais_usadas()
+    with tab_lote: painel_lote(user)
+
+def painel_mais_usadas():
+    try: frases = obter_indice_busca().frases
+    except Exception: st.warning("Não foi possível carregar as frases."); return
+    popularidade()
+    uso = obter_uso()
+    ids = uso.mais_usadas(50, frases)
+    if not ids: st.info("Ainda não há cópias registradas."); return
+    st.caption("Cada uso perde metade do peso a cada 14 dias: o ranking mostra o que a equipe está usando agora.")
+    st.dataframe([{
+        "id": i, "empresa": frases[i]['empresa'], "documento": frases[i]['documento'], "motivo": frases[i]['motivo'],
+        "cópias": uso.contagens.get(i, (0, 0))[0], "visualizações": uso.contagens.get(i, (0, 0))[1],
+        "uso recente": round(decair(uso.pontuacao.get(i, 0.0)), 1),
+    } for i in ids], hide_index=True, use_container_width=True)
+
+def painel_lote(user):
+    st.caption("Escolha uma frase com campos como `{candidato}` e `{vaga}` e envie uma planilha com uma coluna para cada campo.")
+    id_frase = st.number_input("ID da frase", min_value=1, step=1, value=None, key="lote_id")
+    if not id_frase: return
+    frase = frase_por_id(int(id_frase))
+    if not frase: st.warning("Frase não encontrada."); return
+    modelo = compilar(frase['conteudo'])
+    if not modelo.tem_campos: st.info("Essa frase não tem campos para preencher."); return
+    st.caption("Campos: " + ", ".join(f"`{{{c}}}`" for c in dict.fromkeys(modelo.campos))
+               + " • sem a coluna `empresa`, vale a empresa da frase.")
+    arquivo = st.file_uploader("Planilha de candidatos", type=["xlsx", "csv"], key="lote_arquivo")
+    formato = st.radio("Saída", list(FORMATOS_LOTE), horizontal=True, key="lote_formato")
+    if arquivo and st.button("🚀 Gerar mensagens", type="primary"):
+        try:
+            with st.status("Gerando mensagens...", expanded=True) as status:
+                prog = st.progress(0.0)
+                saida, total = gerar_lote(modelo, arquivo, arquivo.name, formato, {"empresa": frase['empresa']}, ao_progredir=prog.progress)
+                st.session_state["lote"] = (saida.read(), formato, total)
+                saida.close()
+                status.update(label="Mensagens geradas", state="complete")
+            registrar_log(user['username'], "Gerar Mensagens", f"ID: {frase['id']} • {total} candidatos")
+        except ValueError as e: st.error(str(e))
+        except Exception as e: st.error(f"Erro: {e}")
+    if st.session_state.get("lote"):
+        dados, fmt, total = st.session_state["lote"]
+        nome, mime = FORMATOS_LOTE[fmt]
+        st.download_button(f"⬇️ Baixar {total} mensagens", data=dados, file_name=nome, mime=mime)
+
+@st.fragment
+@MONITOR.cronometrar()
+def painel_biblioteca():
+    # Fragmento: filtros e paginação reexecutam só este trecho, não o login e o cabeçalho.
+    try: indice = obter_indice_busca()
+    except Exception: indice = IndiceBusca()
     
     with st.container(border=True):
         c1, c2, c3 = st.columns([2, 1, 1])
@@ -235,40 +346,49 @@ def tela_biblioteca(user):
             st.markdown('<div class="filter-label">🔎 Busca Rápida</div>', unsafe_allow_html=True)
             termo = st.text_input("Busca", placeholder="Palavra-chave...", label_visibility="collapsed")
 
-        df_temp = df_filtros.copy()
-        if termo and not df_temp.empty:
-            termo_lower = termo.lower()
-            mask = (
-                df_temp['conteudo'].str.contains(termo_lower, case=False, na=False) |
-                df_temp['empresa'].str.contains(termo_lower, case=False, na=False) |
-                df_temp['motivo'].str.contains(termo_lower, case=False, na=False)
-            )
-            df_temp = df_temp[mask]
-
-        if not df_temp.empty: lista_empresas = sorted(df_temp['empresa'].dropna().unique().tolist())
-        else: lista_empresas = []
-        opcoes_empresas = ["Todas"] + lista_empresas
+        contagens = indice.contagens(indice.buscar(termo))
+        por_empresa = {e: sum(docs.values()) for e, docs in sorted(contagens.items()) if e}
+        opcoes_empresas = ["Todas"] + list(por_empresa)
 
         with c2:
             st.markdown('<div class="filter-label">🏢 Empresa</div>', unsafe_allow_html=True)
-            empresa = st.selectbox("Empresa", options=opcoes_empresas, label_visibility="collapsed")
+            empresa = st.selectbox("Empresa", options=opcoes_empresas, label_visibility="collapsed",
+                                   format_func=lambda e: e if e == "Todas" else f"{e} ({por_empresa[e]})")
 
-        if empresa != "Todas" and not df_temp.empty: df_temp = df_temp[df_temp['empresa'] == empresa]
-        
-        if not df_temp.empty: lista_docs = sorted(df_temp['documento'].dropna().unique().tolist())
-        else: lista_docs = []
-        opcoes_docs = ["Todos"] + lista_docs
+        por_doc = {}
+        for e, docs in contagens.items():
+            if empresa in ("Todas", e):
+                for d, n in docs.items():
+                    if d: por_doc[d] = por_doc.get(d, 0) + n
+        opcoes_docs = ["Todos"] + sorted(por_doc)
 
         with c3:
             st.markdown('<div class="filter-label">📄 Documento</div>', unsafe_allow_html=True)
-            doc_tipo = st.selectbox("Doc", options=opcoes_docs, label_visibility="collapsed")
-
-    with st.spinner("Carregando modelos..."):
-        dados = buscar_frases_final(termo if termo else None, empresa, doc_tipo)
+            doc_tipo = st.selectbox("Doc", options=opcoes_docs, label_visibility="collapsed",
+                                    format_func=lambda d: d if d == "Todos" else f"{d} ({por_doc[d]})")
+
+    tamanho = st.session_state.get("bib_tamanho", TAMANHOS_PAGINA[0])
+    ordem = st.session_state.get("bib_ordem", next(iter(ORDENS)))
+    filtro_atual = (termo, empresa, doc_tipo, tamanho, ordem)
+    if st.session_state.get("bib_filtro") != filtro_atual:
+        st.session_state["bib_filtro"] = filtro_atual
+        st.session_state["bib_cursores"] = [None]
+
+    # Uma página por vez, a partir da chave da anterior: a grade mostra só `tamanho` cartões.
+    cursores = st.session_state["bib_cursores"]
+    # A chave de cada página leva a popularidade do momento; ela fica congelada enquanto se pagina,
+    # senão as visualizações mudam a ordem e as chaves guardadas deixam de valer.
+    if len(cursores) == 1: st.session_state["bib_pop"] = dict(popularidade()) if ORDENS[ordem] else None
+    pop = st.session_state["bib_pop"]
+    dados, total, cursor = buscar_frases_final(termo or None, empresa, doc_tipo, tamanho, cursores[-1], pop)
 
     if not dados: st.warning("📭 Nenhuma frase encontrada."); return
 
-    st.markdown(f"<small style='color:#666'>Encontrados: {len(dados)} modelos</small>", unsafe_allow_html=True)
+    c_info, c_ordem, c_tam = st.columns([3, 1, 1], vertical_alignment="center")
+    inicio = (len(cursores) - 1) * tamanho
+    c_info.markdown(f"<small style='color:#666'>Mostrando {inicio + 1}–{inicio + len(dados)} de {total} modelos</small>", unsafe_allow_html=True)
+    c_ordem.selectbox("Ordenar", list(ORDENS), key="bib_ordem")
+    c_tam.selectbox("Por página", TAMANHOS_PAGINA, key="bib_tamanho")
     st.divider()
 
     col1, col2 = st.columns(2)
@@ -276,119 +396,283 @@ def tela_biblioteca(user):
         with (col1 if i % 2 == 0 else col2):
             card_frase(frase)
 
+    c_ant, c_pag, c_prox = st.columns([1, 2, 1], vertical_alignment="center")
+    c_ant.button("⬅️ Anterior", key="bib_anterior", disabled=len(cursores) == 1, on_click=cursores.pop, use_container_width=True)
+    c_pag.caption(f"Página {len(cursores)} de {-(-total // tamanho)}")
+    c_prox.button("Próxima ➡️", key="bib_proxima", disabled=cursor is None, on_click=cursores.append, args=(cursor,), use_container_width=True)
+
+@MONITOR.cronometrar()
 def tela_adicionar(user):
     st.markdown("### ➕ Adicionar Novo Modelo")
     tab_manual, tab_import = st.tabs(["📝 Manual", "📗 Importar Excel"])
     with tab_manual:
-        with st.form("form_add", clear_on_submit=True):
+        # A chave muda a cada frase salva: limpa o formulário sem perder o texto quando há aviso.
+        with st.form(f"form_add_{st.session_state.get('form_add_n', 0)}"):
             c1, c2 = st.columns(2)
             ne = c1.text_input("Empresa", placeholder="Ex: Gupy Tech")
             nd = c2.text_input("Tipo de Documento", placeholder="Ex: Carta Recusa")
             nm = st.text_input("Motivo", placeholder="Ex: Baixa Qualificação")
             nc = st.text_area("Texto do Modelo", height=150)
+            ignorar_parecidas = st.checkbox("Salvar mesmo se houver frase parecida")
             if st.form_submit_button("💾 Salvar Frase", type="primary", use_container_width=True):
                 if not (ne and nm and nc): st.error("Preencha campos obrigatórios.")
                 else:
                     try:
                         check = supabase.table("frases").select("id").eq("conteudo", padronizar(nc)).execute()
+                        similaridade = None if ignorar_parecidas else obter_corpus().similaridade(esperar=False)
+                        parecidas = similaridade.similares(nc, ne, LIMIAR_SIMILARIDADE) if similaridade else []
+                        if not ignorar_parecidas and similaridade is None:
+                            st.caption("⏳ Checagem de frases parecidas ainda carregando; só duplicadas exatas foram verificadas.")
                         if check.data: st.warning("Frase duplicada.")
+                        elif parecidas:
+                            frases = obter_corpus().indice.frases
+                            st.warning("Já existem frases muito parecidas. Marque a opção acima para salvar mesmo assim.")
+                            for id_similar, grau in parecidas[:3]:
+                                f = frases.get(id_similar, {})
+                                st.caption(f"#{id_similar} • {f.get('empresa', '')} • {grau:.0%} parecida — {f.get('conteudo', '')[:120]}")
                         else:
-                            supabase.table("frases").insert({
+                            res = supabase.table("frases").insert({
                                 "empresa": padronizar(ne), "documento": padronizar(nd), "motivo": padronizar(nm), 
                                 "conteudo": padronizar(nc), "revisado_por": user['username'], 
                                 "data_revisao": datetime.now().strftime('%Y-%m-%d')
                             }).execute()
                             registrar_log(user['username'], "Adicionar Frase", f"Empresa: {ne}")
-                            st.toast("✅ Salvo com sucesso!"); time.sleep(1); st.cache_data.clear(); st.rerun()
+                            obter_corpus().aplicar(res.data or [])
+                            st.session_state["form_add_n"] = st.session_state.get("form_add_n", 0) + 1
+                            avisar("✅ Salvo com sucesso!"); st.rerun()
                     except Exception as e: st.error(f"Erro: {e}")
 
     with tab_import:
         st.info("Colunas Excel: `empresa`, `motivo`, `conteudo`, `documento` (opc).")
         arquivo = st.file_uploader("Arquivo .xlsx", type=["xlsx"])
+        bloquear_parecidas = st.checkbox("Não importar frases quase duplicadas", value=True)
         if arquivo and st.button("🚀 Processar", type="primary"):
             try:
-                df = pd.read_excel(arquivo); df.columns = [c.lower().strip() for c in df.columns]
-                if not {'empresa', 'motivo', 'conteudo'}.issubset(df.columns): st.error("Colunas incorretas.")
-                else:
-                    with st.status("Importando...", expanded=True):
-                        res = supabase.table("frases").select("empresa, motivo, conteudo").execute()
-                        existentes = set([gerar_assinatura(i['empresa'], i['motivo'], i['conteudo']) for i in res.data])
-                        sucesso, dupl, erros = 0, 0, 0
-                        prog = st.progress(0)
-                        for i, row in df.iterrows():
-                            try:
-                                el, ml, cl = padronizar(row['empresa']), padronizar(row['motivo']), padronizar(row['conteudo'])
-                                if gerar_assinatura(el, ml, cl) in existentes: dupl += 1
-                                else:
-                                    supabase.table("frases").insert({
-                                        "empresa": el, "documento": padronizar(row.get('documento', 'Geral')),
-                                        "motivo": ml, "conteudo": cl, "revisado_por": user['username'],
-                                        "data_revisao": datetime.now().strftime('%Y-%m-%d')
-                                    }).execute()
-                                    existentes.add(gerar_assinatura(el, ml, cl)); sucesso += 1
-                            except: erros += 1
-                            prog.progress((i+1)/len(df))
-                    st.success(f"Sucesso: {sucesso} | Duplicados: {dupl}"); time.sleep(2); st.cache_data.clear(); st.rerun()
+                from importacao import importar_planilha
+                with st.status("Importando...", expanded=True) as status:
+                    prog = st.progress(0.0)
+                    similaridade = obter_corpus().similaridade(esperar=False) if bloquear_parecidas else None
+                    if bloquear_parecidas and similaridade is None:
+                        st.caption("⏳ Checagem de frases parecidas ainda carregando; só duplicadas exatas serão barradas.")
+                    resumo = importar_planilha(supabase, arquivo, user['username'], ao_progredir=prog.progress,
+                                               similaridade=similaridade, limiar=LIMIAR_SIMILARIDADE)
+                    status.update(label="Importação concluída", state="complete" if not resumo["falhas"] else "error")
+                for falha in resumo["falhas"]: st.error(falha)
+                st.success(f"Sucesso: {resumo['sucesso']} | Duplicados: {resumo['duplicados']} | Parecidas: {resumo['parecidas']} | Erros: {resumo['erros']}")
+                if resumo["lista_parecidas"]:
+                    with st.expander(f"🔁 {resumo['parecidas']} frases parecidas não importadas"):
+                        st.dataframe(resumo["lista_parecidas"], hide_index=True)
+                registrar_log(user['username'], "Importar Excel", f"Inseridas: {resumo['sucesso']}")
+                obter_corpus().aplicar(resumo["inseridas"])
+            except ValueError as e: st.error(f"Planilha inválida: {e}")
             except Exception as e: st.error(f"Erro: {e}")
 
+@MONITOR.cronometrar()
 def tela_manutencao(user):
     st.markdown("### 🛠️ Editar ou Excluir")
-    q = st.text_input("Buscar ID ou Termo", placeholder="ID ou texto...")
-    query = supabase.table("frases").select("*").order("id", desc=True)
-    if q:
-        if q.isdigit(): query = query.eq("id", q)
-        else: query = query.or_(f"empresa.ilike.%{q}%,motivo.ilike.%{q}%")
-    else: query = query.limit(5)
-    items = query.execute().data
-    if not items and q: st.info("Nada encontrado.")
-    for item in items:
-        with st.expander(f"#{item['id']} | {item['empresa']} - {item['motivo']}"):
-            with st.form(key=f"fe_{item['id']}"):
-                c1, c2, c3 = st.columns([1.5, 1.5, 1])
-                ne = c1.text_input("Empresa", value=item['empresa'])
-                nm = c2.text_input("Motivo", value=item['motivo'])
-                nd = c3.text_input("Doc", value=item['documento'])
-                nc = st.text_area("Conteúdo", value=item['conteudo'], height=150)
-                c_sv, c_del = st.columns([1, 4])
-                if c_sv.form_submit_button("💾 Salvar"):
-                    supabase.table("frases").update({
-                        "empresa": ne, "motivo": nm, "documento": nd, "conteudo": nc, "revisado_por": user['username']
-                    }).eq("id", item['id']).execute()
-                    registrar_log(user['username'], "Editar", f"ID: {item['id']}"); st.toast("Salvo!"); time.sleep(1); st.cache_data.clear(); st.rerun()
-                if c_del.form_submit_button("🗑️ Excluir"):
-                    supabase.table("frases").delete().eq("id", item['id']).execute()
-                    registrar_log(user['username'], "Excluir", f"ID: {item['id']}"); st.toast("Excluído!"); time.sleep(1); st.cache_data.clear(); st.rerun()
-
+    painel_manutencao(user)
+
+@st.fragment
+def painel_manutencao(user):
+    q = st.text_input("Buscar ID ou Termo", placeholder="ID ou texto...").strip()
+    if st.session_state.get("man_termo") != q:
+        st.session_state.update(man_termo=q, man_cursores=[None])
+    cursores = st.session_state["man_cursores"]
+    if q.isdigit():
+        frase = frase_por_id(int(q))
+        items, proximo = ([frase] if frase else []), None
+    else:
+        try: obter_indice_busca()
+        except Exception: pass
+        items, proximo = buscar_manutencao(q, cursores[-1], obter_corpus().versao)
+    if not items:
+        st.info("Nada encontrado." if q else "Nenhuma frase cadastrada."); return
+    por_id = {item['id']: item for item in items}
+
+    st.caption("Marque as linhas para editar ou excluir em lote.")
+    # A versão do corpus entra na chave: depois de uma gravação a seleção (índices de linha) zera,
+    # em vez de apontar para outras frases da página recarregada.
+    versao = obter_corpus().versao
+    tabela = st.dataframe(
+        [{k: item.get(k) for k in ("id", "empresa", "documento", "motivo", "conteudo")} for item in items],
+        hide_index=True, use_container_width=True, on_select="rerun", selection_mode="multi-row",
+        key=f"man_tabela_{q}_{len(cursores)}_{versao}")
+    selecionados = [items[i]['id'] for i in tabela.selection.rows if i < len(items)]
+    c_ant, c_pag, c_prox = st.columns([1, 2, 1], vertical_alignment="center")
+    c_ant.button("⬅️ Anterior", disabled=len(cursores) == 1, on_click=cursores.pop, use_container_width=True)
+    c_pag.caption(f"Página {len(cursores)} • {len(items)} frases")
+    c_prox.button("Próxima ➡️", disabled=proximo is None, on_click=cursores.append, args=(proximo,), use_container_width=True)
+
+    if selecionados:
+        form_lote(user, selecionados, versao)
+    # Só a frase escolhida ganha formulário de edição.
+    editar = st.selectbox("✏️ Editar frase", [None, *por_id], index=1 if q.isdigit() else 0,
+                          format_func=lambda i: "Selecione..." if i is None else f"#{i} | {por_id[i]['empresa']} - {por_id[i]['motivo']}")
+    if editar is not None:
+        form_edicao(user, por_id[editar])
+
+def form_edicao(user, item):
+    with st.form(key=f"fe_{item['id']}"):
+        c1, c2, c3 = st.columns([1.5, 1.5, 1])
+        ne = c1.text_input("Empresa", value=item['empresa'])
+        nm = c2.text_input("Motivo", value=item['motivo'])
+        nd = c3.text_input("Doc", value=item['documento'])
+        nc = st.text_area("Conteúdo", value=item['conteudo'], height=150)
+        c_sv, c_del = st.columns([1, 4])
+        if c_sv.form_submit_button("💾 Salvar"):
+            res = supabase.table("frases").update({
+                "empresa": ne, "motivo": nm, "documento": nd, "conteudo": nc, "revisado_por": user['username']
+            }).eq("id", item['id']).execute()
+            obter_corpus().aplicar(res.data or [])
+            registrar_log(user['username'], "Editar", f"ID: {item['id']}"); avisar("Salvo!"); st.rerun()
+        if c_del.form_submit_button("🗑️ Excluir"):
+            supabase.table("frases").delete().eq("id", item['id']).execute()
+            obter_corpus().remover([item['id']])
+            registrar_log(user['username'], "Excluir", f"ID: {item['id']}"); avisar("Excluído!"); st.rerun()
+
+def form_lote(user, ids, versao):
+    """Edição/exclusão das frases marcadas numa única requisição."""
+    # Formulário novo a cada versão: a confirmação de exclusão não sobrevive a uma gravação.
+    with st.form(f"form_lote_{versao}"):
+        st.markdown(f"**{len(ids)} selecionadas** — campos em branco ficam como estão.")
+        c1, c2, c3 = st.columns([1.5, 1.5, 1])
+        ne = c1.text_input("Empresa")
+        nm = c2.text_input("Motivo")
+        nd = c3.text_input("Doc")
+        confirmar = st.checkbox("Confirmo a exclusão das selecionadas")
+        c_sv, c_del = st.columns([1, 4])
+        detalhe = f"IDs: {', '.join(map(str, ids))}"
+        if c_sv.form_submit_button("💾 Aplicar"):
+            dados = {k: padronizar(v) for k, v in (("empresa", ne), ("motivo", nm), ("documento", nd)) if v.strip()}
+            if not dados: st.warning("Preencha ao menos um campo.")
+            else:
+                res = supabase.table("frases").update({**dados, "revisado_por": user['username']}).in_("id", ids).execute()
+                obter_corpus().aplicar(res.data or [])
+                registrar_log(user['username'], "Editar em Lote", detalhe); avisar(f"{len(ids)} frases salvas!"); st.rerun()
+        if c_del.form_submit_button("🗑️ Excluir"):
+            if not confirmar: st.warning("Marque a confirmação para excluir.")
+            else:
+                supabase.table("frases").delete().in_("id", ids).execute()
+                obter_corpus().remover(ids)
+                registrar_log(user['username'], "Excluir em Lote", detalhe); avisar(f"{len(ids)} frases excluídas!"); st.rerun()
+
+@MONITOR.cronometrar()
 def tela_admin(user_logado):
     st.markdown("### ⚙️ Administração")
-    tab_users, tab_logs, tab_bkp, tab_danger = st.tabs(["👥 Usuários", "📜 Logs", "💾 Backup", "🚨 Danger"])
+    tab_users, tab_logs, tab_bkp, tab_dupl, tab_perf, tab_danger = st.tabs(["👥 Usuários", "📜 Logs", "💾 Backup", "🔁 Parecidas", "📈 Desempenho", "🚨 Danger"])
     
     with tab_users:
-        users = supabase.table("usuarios").select("*").order("id").execute().data
+        autenticador = obter_autenticador()
+        users = supabase.table("usuarios").select("id, username, admin").order("id").execute().data
         for u in users:
             with st.expander(f"👤 {u['username']}"):
                 with st.form(f"eu_{u['id']}"):
-                    np = st.text_input("Nova Senha", value=u['senha'], type="password")
+                    np = st.text_input("Nova Senha", placeholder="Deixe em branco para manter", type="password")
                     ia = st.checkbox("Admin", value=u.get('admin', False))
                     if st.form_submit_button("Atualizar"):
-                        supabase.table("usuarios").update({"senha": np, "admin": ia}).eq("id", u['id']).execute()
-                        st.success("Atualizado!"); time.sleep(1); st.rerun()
+                        dados = {"admin": ia, **({"senha": gerar_hash(np, autenticador.iteracoes)} if np else {})}
+                        supabase.table("usuarios").update(dados).eq("id", u['id']).execute()
+                        autenticador.usuarios.invalidar(u['username'])
+                        avisar("Atualizado!"); st.rerun()
                     if st.form_submit_button("Excluir"):
                          if u['username'] != user_logado['username']:
-                             supabase.table("usuarios").delete().eq("id", u['id']).execute(); st.rerun()
+                             supabase.table("usuarios").delete().eq("id", u['id']).execute()
+                             autenticador.usuarios.invalidar(u['username']); st.rerun()
         with st.container(border=True):
             st.markdown("New User"); nu = st.text_input("User"); ns = st.text_input("Pass", type="password"); na = st.checkbox("Admin")
             if st.button("Criar") and nu and ns:
-                supabase.table("usuarios").insert({"username": nu, "senha": ns, "admin": na}).execute(); st.rerun()
+                supabase.table("usuarios").insert({"username": nu, "senha": gerar_hash(ns, autenticador.iteracoes), "admin": na}).execute()
+                autenticador.usuarios.invalidar(nu); st.rerun()
 
     with tab_logs:
         if st.button("Atualizar"): st.rerun()
+        auditoria = obter_auditoria()
+        if auditoria.fila.qsize() or auditoria.pendentes_em_disco:
+            st.caption(f"⏳ Na fila: {auditoria.fila.qsize()} • Aguardando reenvio: {auditoria.pendentes_em_disco}")
+        if auditoria.rejeitados:
+            st.caption(f"⚠️ {auditoria.rejeitados} eventos recusados pelo banco, guardados em {os.path.basename(auditoria.arquivo_rejeitados)}")
+        st.caption(f"📋 Uso das frases: {obter_uso().pendentes} frases com eventos a enviar • {obter_uso().enviados} totais enviados")
         try: st.dataframe(supabase.table("logs").select("*").order("id", desc=True).limit(50).execute().data, hide_index=True)
         except: st.write("Sem logs.")
 
     with tab_bkp:
-        df = supabase.table("frases").select("*").execute().data
-        st.download_button("⬇️ Backup CSV", data=converter_para_csv(df), file_name="backup.csv", mime="text/csv")
+        from backup import FORMATOS, MIME, exportar, restaurar
+        c_exp, c_rest = st.columns(2)
+        with c_exp:
+            with st.container(border=True):
+                st.markdown("#### ⬇️ Exportar")
+                formato = st.radio("Formato", list(FORMATOS), horizontal=True, key="bkp_formato")
+                if "parquet" not in FORMATOS: st.caption("Parquet indisponível: instale o pyarrow (requirements.txt).")
+                if st.button("📦 Gerar backup", use_container_width=True):
+                    with st.spinner("Exportando frases..."):
+                        arquivo, manifesto = exportar(supabase, formato)
+                        st.session_state["backup"] = (arquivo.read(), manifesto)
+                        arquivo.close()
+                if st.session_state.get("backup"):
+                    dados, manifesto = st.session_state["backup"]
+                    st.caption(f"{manifesto['linhas']} frases • {len(dados) / 1024:.0f} KB • sha256 {manifesto['sha256'][:12]}…")
+                    st.download_button("⬇️ Baixar backup", data=dados, file_name=manifesto["arquivo"], mime=MIME[manifesto["formato"]])
+                    st.download_button("🧾 Baixar manifesto", data=json.dumps(manifesto, indent=2), file_name=manifesto["arquivo"] + ".manifest.json", mime="application/json")
+        with c_rest:
+            with st.container(border=True):
+                st.markdown("#### ⬆️ Restaurar")
+                arq_bkp = st.file_uploader("Arquivo de backup", type=["gz", "parquet"], key="bkp_arquivo")
+                arq_man = st.file_uploader("Manifesto (opcional)", type=["json"], key="bkp_manifesto")
+                if arq_bkp and st.button("♻️ Restaurar", use_container_width=True):
+                    try:
+                        with st.status("Restaurando...", expanded=True):
+                            prog = st.progress(0.0)
+                            manifesto = json.load(arq_man) if arq_man else None
+                            resumo = restaurar(supabase, arq_bkp, arq_bkp.name, manifesto, ao_progredir=prog.progress)
+                        for falha in resumo["falhas"]: st.error(falha)
+                        st.success(f"Restauradas: {resumo['restauradas']}")
+                        registrar_log(user_logado['username'], "Restaurar Backup", arq_bkp.name)
+                        atualizar_corpus()
+                    except ValueError as e: st.error(str(e))
+                    except Exception as e: st.error(f"Erro: {e}")
+
+    with tab_dupl:
+        st.caption("Agrupa frases quase duplicadas do banco para revisão e limpeza.")
+        limiar = st.slider("Similaridade mínima", 0.5, 1.0, LIMIAR_SIMILARIDADE, 0.05)
+        c_analisar, c_atualizar = st.columns(2)
+        if c_analisar.button("🔍 Analisar"): st.session_state["limiar_parecidas"] = limiar
+        if c_atualizar.button("🔄 Atualizar", key="parecidas_atualizar"): st.rerun()
+        # O agrupamento leva segundos em corpus grandes: roda numa thread e a tela só mostra o resultado pronto.
+        resultado = None
+        if "limiar_parecidas" in st.session_state:
+            resultado = obter_corpus().agrupar_parecidas(st.session_state["limiar_parecidas"])
+            if obter_corpus().agrupando: st.info("⏳ Comparando frases em segundo plano... clique em Atualizar em instantes.")
+        if resultado is not None:
+            grupos = resultado["grupos"]
+            frases = obter_corpus().indice.frases
+            st.markdown(f"**{len(grupos)} grupos** • {sum(len(g) for g in grupos)} frases • calculado em {resultado['segundos']:.1f} s")
+            for grupo in grupos[:100]:
+                linhas = [frases[i] for i in grupo if i in frases]
+                if len(linhas) < 2: continue
+                with st.expander(f"{len(linhas)} frases • {linhas[0]['empresa']} - {linhas[0]['motivo']}"):
+                    st.dataframe([{k: f.get(k) for k in ("id", "empresa", "documento", "motivo", "conteudo")} for f in linhas], hide_index=True)
+
+    with tab_perf:
+        c_att, c_csv, c_json, c_limpar = st.columns(4)
+        if c_att.button("🔄 Atualizar", key="perf_atualizar"): st.rerun()
+        c_csv.download_button("⬇️ CSV", data=MONITOR.exportar_csv(), file_name="desempenho.csv", mime="text/csv")
+        c_json.download_button("⬇️ JSON", data=MONITOR.exportar_json(), file_name="desempenho.json", mime="application/json")
+        if c_limpar.button("🧹 Zerar"): MONITOR.limpar(); st.rerun()
+        st.caption(f"Percentis das últimas {MONITOR.janela} medições de cada métrica, somando todas as sessões deste servidor.")
+        st.dataframe(MONITOR.resumo(), hide_index=True, use_container_width=True)
+        if MONITOR.resumo_cache(): st.dataframe(MONITOR.resumo_cache(), hide_index=True)
+        st.caption(f"🔐 Hash de senha: {obter_autenticador().iteracoes:,} iterações PBKDF2 • orçamento {ORCAMENTO_MS} ms por verificação (métrica auth.verificar_senha).")
+        with st.expander("🚀 Cold start deste servidor"):
+            st.caption("Tempo de cada etapa na primeira execução do script neste processo.")
+            st.dataframe(MONITOR.resumo_inicio(), hide_index=True)
+
+        with st.container(border=True):
+            st.markdown("#### 🐢 Amostrador de reruns lentos")
+            MONITOR.amostrador_ativo = st.toggle("Perfilar reruns (cProfile)", value=MONITOR.amostrador_ativo)
+            MONITOR.limite_lento_ms = st.number_input("Guardar perfil acima de (ms)", min_value=100, value=int(MONITOR.limite_lento_ms), step=100)
+            for perfil in list(MONITOR.perfis):
+                with st.expander(f"{perfil['quando']} • {perfil['rotulo']} • {perfil['ms']} ms"):
+                    st.code(perfil["perfil"], language="text")
 
     with tab_danger:
         st.markdown('<div class="danger-zone"><h4 style="margin-top:0;">🚨 Zona de Perigo</h4><p>Ações irreversíveis.</p></div>', unsafe_allow_html=True)
@@ -405,8 +689,8 @@ def tela_admin(user_logado):
                 if st.button("💥 APAGAR TODAS AS FRASES", type="primary", use_container_width=True, disabled=(check_phrase != "CONFIRMAR")):
                     supabase.table("frases").delete().neq("id", 0).execute()
                     registrar_log(user_logado['username'], "RESET TOTAL", "Apagou todas as frases")
-                    st.success("Banco de frases limpo com sucesso!")
-                    time.sleep(2)
+                    obter_corpus().esvaziar()
+                    avisar("Banco de frases limpo com sucesso!")
                     st.rerun()
 
         with c_danger2:
@@ -418,15 +702,16 @@ def tela_admin(user_logado):
                 if st.button("💥 APAGAR OUTROS USUÁRIOS", type="primary", use_container_width=True, disabled=(check_user != "RESETAR USERS")):
                     # Apaga todos que não sejam o usuário atual
                     supabase.table("usuarios").delete().neq("username", user_logado['username']).execute()
+                    obter_autenticador().usuarios.invalidar()
                     registrar_log(user_logado['username'], "RESET USERS", "Apagou outros usuários")
-                    st.success("Outros usuários removidos!")
-                    time.sleep(2)
+                    avisar("Outros usuários removidos!")
                     st.rerun()
 
 # ==============================================================================
 # 6. CONTROLE DE SESSÃO E LOGIN
 # ==============================================================================
 if "usuario_logado" not in st.session_state: st.session_state["usuario_logado"] = None
+if st.session_state.get("aviso"): st.toast(st.session_state.pop("aviso"))
 cookie_manager = stx.CookieManager(key="auth_sys")
 
 if not st.session_state["usuario_logado"]:
@@ -436,11 +721,15 @@ if not st.session_state["usuario_logado"]:
             user_db = recuperar_usuario_cookie(token)
             if user_db: st.session_state["usuario_logado"] = user_db
     except: pass
+else:
+    # Reconfere no cache (sem ir ao banco dentro do TTL): admin alterado ou excluído vale na hora.
+    try: st.session_state["usuario_logado"] = obter_autenticador().usuario(st.session_state["usuario_logado"]["username"])
+    except Exception: pass
 
 if not st.session_state["usuario_logado"]:
     c1, c2, c3 = st.columns([1, 1, 1])
     with c2:
-        st.write(""); st.image(LOGO_URL, width=180)
+        st.write(""); st.image(LOGO, width=180)
         with st.container(border=True):
             st.markdown("<h3 style='text-align:center'>Login</h3>", unsafe_allow_html=True)
             u = st.text_input("Usuário")
@@ -449,13 +738,13 @@ if not st.session_state["usuario_logado"]:
                 user = verificar_login(u, s)
                 if user:
                     st.session_state["usuario_logado"] = user
-                    cookie_manager.set("gupy_token", u, expires_at=datetime.now() + timedelta(days=7))
+                    cookie_manager.set("gupy_token", obter_autenticador().emitir_token(user), expires_at=datetime.now() + timedelta(days=7))
                     st.toast(f"Olá, {user['username']}!"); time.sleep(1); st.rerun()
                 else: st.error("Erro no login.")
 else:
     user = st.session_state["usuario_logado"]
     c_logo, c_nav, c_user = st.columns([1, 5, 1], vertical_alignment="center")
-    with c_logo: st.image(LOGO_URL, width=100)
+    with c_logo: st.image(LOGO, width=100)
     with c_nav:
         opcoes = ["Biblioteca", "Adicionar", "Manutenção"]
         if user.get('admin'): opcoes.append("Admin")
@@ -465,9 +754,13 @@ else:
             cookie_manager.delete("gupy_token"); st.session_state["usuario_logado"] = None; st.rerun()
     st.divider()
 
+    st.session_state["tela_atual"] = selecao
     if selecao == "Biblioteca": tela_biblioteca(user)
     elif selecao == "Adicionar": tela_adicionar(user)
     elif selecao == "Manutenção": tela_manutencao(user)
     elif selecao == "Admin": tela_admin(user)
     
     st.markdown('<div class="footer">Desenvolvido por Pedro Gabriel</div>', unsafe_allow_html=True)
+
+MONITOR.finalizar_rerun(_rerun, st.session_state.get("tela_atual", "Login"))
+MONITOR.marcar_inicio("primeira_tela", _inicio)
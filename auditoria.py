@@ -0,0 +1,216 @@
+"""Gravação assíncrona dos logs de auditoria.
+
+`registrar` só coloca o evento numa fila em memória; uma thread de fundo grava
+os eventos na tabela `logs` em lotes, quando junta `tamanho_lote` eventos ou
+quando passa `intervalo` segundos. Se o Supabase estiver fora, o lote vai para
+um arquivo local (uma linha JSON por evento) que é reenviado no próximo envio
+bem-sucedido, então nenhum evento se perde numa queda.
+
+Cada processo tem o seu arquivo de pendentes (`logs_pendentes.<host>.<pid>.jsonl`),
+para réplicas na mesma pasta não lerem e apagarem o arquivo umas das outras; o
+de um processo que morreu nesta máquina é adotado por quem reenviar primeiro.
+Só falha de rede ou erro 5xx deixa o evento na espera: o que o banco recusar
+(4xx, ex.: coluna inválida) vai para `logs_rejeitados.jsonl` e não trava os
+demais.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_PENDENTES = os.path.join(PASTA, "logs_pendentes.jsonl")
+ARQUIVO_REJEITADOS = os.path.join(PASTA, "logs_rejeitados.jsonl")
+TAMANHO_LOTE = 50
+INTERVALO = 2.0
+# Quanto o encerramento espera a thread entregar o lote que já tinha pego.
+ESPERA_ENCERRAR = 10.0
+# Colocado na fila por `descarregar` para a thread terminar.
+_FIM = object()
+
+
+def _rejeitado(erro):
+    """True quando o banco recusou o conteúdo (4xx): reenviar não adianta."""
+    status = getattr(getattr(erro, "response", None), "status_code", None)
+    if status:
+        return 400 <= status < 500
+    codigo = str(getattr(erro, "code", None) or "")
+    if codigo.startswith("PGRST"):
+        # PGRST0xx é o PostgREST sem conexão com o banco (503); os demais são 4xx.
+        return not codigo.startswith("PGRST0")
+    # SQLSTATE: 22 dado inválido, 23 restrição violada, 42 coluna/permissão.
+    return codigo[:2] in ("22", "23", "42")
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RegistroAuditoria:
+    def __init__(self, cliente, arquivo=ARQUIVO_PENDENTES, tamanho_lote=TAMANHO_LOTE, intervalo=INTERVALO,
+                 arquivo_rejeitados=ARQUIVO_REJEITADOS):
+        self.cliente = cliente
+        raiz, extensao = os.path.splitext(arquivo)
+        self._base = arquivo
+        self._prefixo = f"{raiz}.{socket.gethostname()}."
+        self._extensao = extensao
+        self.arquivo = f"{self._prefixo}{os.getpid()}{extensao}"
+        self.arquivo_rejeitados = arquivo_rejeitados
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.fila = queue.Queue()
+        self.enviados = 0
+        self.pendentes_em_disco = 0
+        self.rejeitados = 0
+        self._em_voo = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._executar, name="auditoria", daemon=True)
+        self._thread.start()
+        atexit.register(self.descarregar)
+
+    def registrar(self, evento):
+        self.fila.put(evento)
+
+    def _coletar(self):
+        """Espera o primeiro evento e junta os seguintes até encher o lote ou estourar o prazo.
+
+        Retorna (lote, parar); `parar` indica que `descarregar` pediu o fim da thread.
+        """
+        evento = self.fila.get()
+        if evento is _FIM:
+            return [], True
+        lote = [evento]
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                evento = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if evento is _FIM:
+                return lote, True
+            lote.append(evento)
+        return lote, False
+
+    def _executar(self):
+        parar = False
+        while not parar:
+            lote, parar = self._coletar()
+            self._em_voo = lote
+            if lote:
+                self._enviar(lote)
+            self._em_voo = []
+
+    def descarregar(self, espera=ESPERA_ENCERRAR):
+        """Encerra a thread, que entrega o lote que já tinha pego, e envia o resto da fila.
+
+        Usado ao encerrar o processo. Se o envio da thread travar além de `espera`,
+        o lote dela e a fila vão para o arquivo de pendentes, sem esperar o lock.
+        """
+        if self._thread.is_alive():
+            self.fila.put(_FIM)
+            self._thread.join(espera)
+        lote = []
+        while True:
+            try:
+                evento = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if evento is not _FIM:
+                lote.append(evento)
+        if self._thread.is_alive():
+            if self._em_voo or lote:
+                self._guardar(self._em_voo + lote)
+        elif lote:
+            self._enviar(lote)
+
+    def _enviar(self, lote):
+        with self._lock:
+            if not self._reenviar_pendentes():
+                self._guardar(lote)
+                return
+            sobra = self._inserir(lote)
+            if sobra:
+                self._guardar(sobra)
+
+    def _inserir(self, eventos):
+        """Insere em lotes. Retorna o que ficou sem enviar por falha de rede/5xx.
+
+        Lote recusado é dividido ao meio até isolar o evento ruim, que vai para
+        o arquivo de rejeitados; o resto do lote segue.
+        """
+        pilha = [eventos[i:i + self.tamanho_lote] for i in range(0, len(eventos), self.tamanho_lote)][::-1]
+        while pilha:
+            parte = pilha.pop()
+            try:
+                self.cliente.table("logs").insert(parte).execute()
+                self.enviados += len(parte)
+            except Exception as e:
+                if not _rejeitado(e):
+                    return parte + [evento for resto in reversed(pilha) for evento in resto]
+                if len(parte) == 1:
+                    self._escrever(self.arquivo_rejeitados, parte, "a")
+                    self.rejeitados += 1
+                else:
+                    meio = len(parte) // 2
+                    pilha += [parte[meio:], parte[:meio]]
+        return []
+
+    @staticmethod
+    def _escrever(arquivo, eventos, modo):
+        with open(arquivo, modo, encoding="utf-8") as f:
+            for evento in eventos:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+    def _guardar(self, eventos, modo="a"):
+        self._escrever(self.arquivo, eventos, modo)
+        self.pendentes_em_disco = len(eventos) if modo == "w" else self.pendentes_em_disco + len(eventos)
+
+    def _adotar_orfaos(self):
+        """Junta ao próprio arquivo os pendentes de processos mortos nesta máquina
+        (e o arquivo único de versões antigas)."""
+        orfaos = [self._base] if os.path.exists(self._base) else []
+        if os.name == "posix":
+            for caminho in glob.glob(glob.escape(self._prefixo) + "*" + glob.escape(self._extensao)):
+                pid = caminho[len(self._prefixo):len(caminho) - len(self._extensao)]
+                if pid.isdigit() and int(pid) != os.getpid() and not _vivo(int(pid)):
+                    orfaos.append(caminho)
+        for caminho in orfaos:
+            adotado = f"{self.arquivo}.adotado"
+            try:
+                # rename é atômico: se dois processos tentarem, só um fica com o arquivo.
+                os.rename(caminho, adotado)
+            except OSError:
+                continue
+            with open(adotado, encoding="utf-8") as f:
+                eventos = [json.loads(linha) for linha in f if linha.strip()]
+            self._guardar(eventos)
+            os.remove(adotado)
+
+    def _reenviar_pendentes(self):
+        """Reenvia o arquivo de pendentes. Retorna False se o banco ainda estiver fora."""
+        self._adotar_orfaos()
+        if not os.path.exists(self.arquivo):
+            return True
+        with open(self.arquivo, encoding="utf-8") as f:
+            eventos = [json.loads(linha) for linha in f if linha.strip()]
+        sobra = self._inserir(eventos)
+        if sobra:
+            # Reescreve só o que faltou, para não duplicar o que já foi.
+            self._guardar(sobra, modo="w")
+            return False
+        os.remove(self.arquivo)
+        self.pendentes_em_disco = 0
+        return True
@@ -0,0 +1,183 @@
+"""Autenticação: hash de senha, token de sessão assinado e cache de usuários.
+
+- Senhas são guardadas como `pbkdf2_sha256$iteracoes$sal$hash`. O custo
+  (iterações) é alto de propósito; `python autenticacao.py --calibrar` mede
+  quantas iterações cabem em `ORCAMENTO_MS` nesta máquina, e cada verificação
+  é registrada no monitor como `auth.verificar_senha`. Senhas antigas em texto
+  puro (ou com outro custo) são regravadas no próximo login bem-sucedido.
+- O cookie guarda um token `usuario.expira.assinatura` (HMAC-SHA256), validado
+  localmente, sem consulta ao banco.
+- Os registros de `usuarios` ficam num cache com TTL; a tela de Admin invalida
+  o usuário que editar ou excluir. Em outras réplicas a mudança vale ao fim do TTL.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+ALGORITMO = "pbkdf2_sha256"
+ITERACOES = 600_000
+ORCAMENTO_MS = 250
+VALIDADE_TOKEN = 7 * 24 * 3600
+TTL_USUARIOS = 300
+COLUNAS_USUARIO = "id, username, senha, admin"
+
+
+def _b64(dados):
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+def _derivar(senha, sal, iteracoes):
+    return hashlib.pbkdf2_hmac("sha256", senha.encode("utf-8"), sal, iteracoes)
+
+
+def gerar_hash(senha, iteracoes=ITERACOES):
+    sal = secrets.token_bytes(16)
+    return f"{ALGORITMO}${iteracoes}${_b64(sal)}${_b64(_derivar(senha, sal, iteracoes))}"
+
+
+def _partes(armazenada):
+    try:
+        algoritmo, iteracoes, sal, hash_ = armazenada.split("$")
+        if algoritmo == ALGORITMO:
+            return int(iteracoes), base64.urlsafe_b64decode(sal + "=="), base64.urlsafe_b64decode(hash_ + "==")
+    except (AttributeError, ValueError):
+        pass
+    return None
+
+
+def verificar_senha(senha, armazenada):
+    if not senha or not armazenada:
+        # Senha vazia (ou usuário sem senha gravada) nunca autentica.
+        return False
+    partes = _partes(armazenada)
+    if partes is None:
+        # Senha legada em texto puro.
+        return hmac.compare_digest(str(senha).encode("utf-8"), str(armazenada).encode("utf-8"))
+    iteracoes, sal, hash_ = partes
+    return hmac.compare_digest(_derivar(senha, sal, iteracoes), hash_)
+
+
+def precisa_regravar(armazenada, iteracoes=ITERACOES):
+    partes = _partes(armazenada)
+    return partes is None or partes[0] != iteracoes
+
+
+def calibrar(orcamento_ms=ORCAMENTO_MS, amostra=100_000):
+    """Iterações que cabem no orçamento de tempo desta máquina."""
+    tempos = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        _derivar("calibracao", b"0" * 16, amostra)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    ms = sorted(tempos)[1]
+    return max(amostra, int(amostra * orcamento_ms / ms) // 1000 * 1000)
+
+
+def assinar_token(chave, username, validade=VALIDADE_TOKEN):
+    corpo = f"{_b64(username.encode('utf-8'))}.{int(time.time() + validade)}"
+    return f"{corpo}.{_b64(hmac.new(chave, corpo.encode(), hashlib.sha256).digest())}"
+
+
+def validar_token(chave, token):
+    """Devolve o username do token, ou None se estiver adulterado ou vencido."""
+    try:
+        usuario, expira, assinatura = token.split(".")
+        corpo = f"{usuario}.{expira}"
+        esperado = _b64(hmac.new(chave, corpo.encode(), hashlib.sha256).digest())
+        if hmac.compare_digest(assinatura, esperado) and int(expira) > time.time():
+            return base64.urlsafe_b64decode(usuario + "==").decode("utf-8")
+    except (AttributeError, ValueError):
+        pass
+    return None
+
+
+class CacheUsuarios:
+    def __init__(self, cliente, ttl=TTL_USUARIOS):
+        self.cliente = cliente
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._registros = {}
+
+    def obter(self, username):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._registros.get(username)
+        if item and agora - item[0] < self.ttl:
+            return item[1]
+        res = self.cliente.table("usuarios").select(COLUNAS_USUARIO).eq("username", username).execute()
+        registro = res.data[0] if res.data else None
+        with self._lock:
+            self._registros[username] = (agora, registro)
+        return registro
+
+    def invalidar(self, username=None):
+        with self._lock:
+            if username is None:
+                self._registros.clear()
+            else:
+                self._registros.pop(username, None)
+
+
+class Autenticador:
+    def __init__(self, cliente, chave, iteracoes=ITERACOES, ttl=TTL_USUARIOS, monitor=None):
+        if not chave:
+            raise ValueError("Chave de assinatura dos tokens vazia.")
+        self.cliente = cliente
+        self.chave = chave if isinstance(chave, bytes) else chave.encode("utf-8")
+        self.iteracoes = iteracoes
+        self.usuarios = CacheUsuarios(cliente, ttl)
+        self.monitor = monitor
+
+    def login(self, username, senha):
+        registro = self.usuarios.obter(username) if username else None
+        inicio = time.perf_counter()
+        if registro:
+            ok = verificar_senha(senha, registro["senha"])
+        else:
+            # Usuário inexistente também paga o custo do hash, para não revelar quem existe pelo tempo.
+            _derivar(senha or "", b"\0" * 16, self.iteracoes)
+            ok = False
+        if self.monitor:
+            self.monitor.registrar("auth.verificar_senha", (time.perf_counter() - inicio) * 1000)
+        if not ok:
+            return None
+        if precisa_regravar(registro["senha"], self.iteracoes):
+            self.definir_senha(registro["id"], username, senha)
+        return publico(registro)
+
+    def definir_senha(self, id_usuario, username, senha):
+        self.cliente.table("usuarios").update({"senha": gerar_hash(senha, self.iteracoes)}).eq("id", id_usuario).execute()
+        self.usuarios.invalidar(username)
+
+    def emitir_token(self, usuario):
+        return assinar_token(self.chave, usuario["username"])
+
+    def usuario(self, username):
+        registro = self.usuarios.obter(username) if username else None
+        return publico(registro) if registro else None
+
+    def usuario_do_token(self, token):
+        return self.usuario(validar_token(self.chave, token) if token else None)
+
+
+def publico(registro):
+    """Registro do usuário sem o hash da senha, para guardar na sessão."""
+    return {k: v for k, v in registro.items() if k != "senha"}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ferramentas de senha do Gupy Frases.")
+    parser.add_argument("--calibrar", action="store_true", help="mede as iterações que cabem no orçamento")
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_MS)
+    args = parser.parse_args()
+    if args.calibrar:
+        iteracoes = calibrar(args.orcamento_ms)
+        armazenada = gerar_hash("teste", iteracoes)
+        inicio = time.perf_counter()
+        verificar_senha("teste", armazenada)
+        print(f"{iteracoes} iterações (~{(time.perf_counter() - inicio) * 1000:.0f} ms por verificação)")
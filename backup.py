@@ -0,0 +1,161 @@
+"""Exportação e restauração do banco de frases.
+
+O backup só é gerado quando o admin pede. A tabela é lida em páginas e cada
+página vai direto para um arquivo temporário comprimido, junto com um
+manifesto (linhas, colunas e SHA-256) que a restauração usa para conferir o
+arquivo antes de regravar as frases em lotes.
+
+A restauração descarta o `updated_at` do arquivo: as linhas regravadas ganham
+`now()` e a sincronização por delta (corpus.py) as enxerga como alteradas. Isso
+vale também para as que tinham sido apagadas, porque a lápide delas fica mais
+velha que a linha restaurada e deixa de ser aplicada.
+
+Como a restauração preserva os ids, rode depois no SQL Editor:
+
+    select setval(pg_get_serial_sequence('frases', 'id'), (select max(id) from frases));
+"""
+import csv
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import tempfile
+from datetime import datetime
+
+from corpus import paginar_por_id
+from importacao import TAMANHO_LOTE, inserir_lote
+
+FORMATOS = {"csv": ".csv.gz", "jsonl": ".jsonl.gz"}
+# O pyarrow é pesado: só confere se está instalado e importa quando o formato for usado.
+if importlib.util.find_spec("pyarrow"):
+    FORMATOS["parquet"] = ".parquet"
+MIME = {"csv": "application/gzip", "jsonl": "application/gzip", "parquet": "application/vnd.apache.parquet"}
+# Até esse tamanho o arquivo temporário fica só em memória.
+LIMITE_MEMORIA = 8 * 1024 * 1024
+
+
+def _sha256(arquivo):
+    h = hashlib.sha256()
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+        h.update(bloco)
+    arquivo.seek(0)
+    return h.hexdigest()
+
+
+def _paginas(linhas, tamanho):
+    pagina = []
+    for linha in linhas:
+        pagina.append(linha)
+        if len(pagina) == tamanho:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+
+def _escrever_csv(destino, linhas):
+    colunas, n = [], 0
+    with gzip.GzipFile(fileobj=destino, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8", newline="") as txt:
+        writer = None
+        for linha in linhas:
+            if writer is None:
+                colunas = list(linha)
+                writer = csv.DictWriter(txt, fieldnames=colunas, extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(linha)
+            n += 1
+    return colunas, n
+
+
+def _escrever_jsonl(destino, linhas):
+    colunas, n = [], 0
+    with gzip.GzipFile(fileobj=destino, mode="wb") as gz:
+        for linha in linhas:
+            colunas = colunas or list(linha)
+            gz.write(json.dumps(linha, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+            n += 1
+    return colunas, n
+
+
+def _escrever_parquet(destino, linhas):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, schema, n = None, None, 0
+    for pagina in _paginas(linhas, TAMANHO_LOTE):
+        if writer is None:
+            # Colunas inteiramente nulas na primeira página viram texto.
+            inferido = pa.Table.from_pylist(pagina).schema
+            schema = pa.schema([pa.field(c.name, pa.string() if pa.types.is_null(c.type) else c.type) for c in inferido])
+            writer = pq.ParquetWriter(destino, schema, compression="zstd")
+        writer.write_table(pa.Table.from_pylist(pagina, schema=schema))
+        n += len(pagina)
+    if writer:
+        writer.close()
+    return (schema.names if schema else []), n
+
+
+ESCRITORES = {"csv": _escrever_csv, "jsonl": _escrever_jsonl, "parquet": _escrever_parquet}
+
+
+def exportar(cliente, formato="csv"):
+    """Gera o backup da tabela `frases`. Retorna (arquivo temporário, manifesto)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato indisponível: {formato}")
+    destino = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA)
+    linhas = paginar_por_id(lambda: cliente.table("frases").select("*"))
+    colunas, total = ESCRITORES[formato](destino, linhas)
+    criado_em = datetime.now()
+    manifesto = {
+        "tabela": "frases", "formato": formato, "linhas": total, "colunas": colunas,
+        "arquivo": f"backup_frases_{criado_em:%Y%m%d_%H%M%S}{FORMATOS[formato]}",
+        "sha256": _sha256(destino), "criado_em": criado_em.isoformat(timespec="seconds"),
+    }
+    return destino, manifesto
+
+
+def detectar_formato(nome):
+    for formato, extensao in FORMATOS.items():
+        if nome.endswith(extensao):
+            return formato
+    raise ValueError("Arquivo de backup não reconhecido (.csv.gz, .jsonl.gz ou .parquet).")
+
+
+def ler_backup(arquivo, formato):
+    """Gera os registros do arquivo de backup sem carregar tudo na memória."""
+    if formato == "csv":
+        with gzip.open(arquivo, "rt", encoding="utf-8", newline="") as txt:
+            for linha in csv.DictReader(txt):
+                yield {k: (v if v != "" else None) for k, v in linha.items()}
+    elif formato == "jsonl":
+        with gzip.open(arquivo, "rt", encoding="utf-8") as txt:
+            for linha in txt:
+                if linha.strip():
+                    yield json.loads(linha)
+    else:
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(arquivo).iter_batches(batch_size=TAMANHO_LOTE):
+            yield from lote.to_pylist()
+
+
+def restaurar(cliente, arquivo, nome, manifesto=None, ao_progredir=None):
+    """Regrava as frases do backup em lotes (upsert por id). Retorna o resumo."""
+    formato = detectar_formato(nome)
+    if manifesto:
+        if _sha256(arquivo) != manifesto.get("sha256"):
+            raise ValueError("Checksum não confere com o manifesto.")
+    resumo = {"restauradas": 0, "falhas": []}
+    total = (manifesto or {}).get("linhas")
+    linhas = ({k: v for k, v in linha.items() if k != "updated_at"} for linha in ler_backup(arquivo, formato))
+    for n, lote in enumerate(_paginas(linhas, TAMANHO_LOTE), start=1):
+        try:
+            inserir_lote(cliente, lote, upsert=True)
+            resumo["restauradas"] += len(lote)
+        except Exception as e:
+            resumo["falhas"].append(f"Lote {n}: {e}")
+        if ao_progredir and total:
+            ao_progredir(min(n * TAMANHO_LOTE / total, 1.0))
+    return resumo
@@ -0,0 +1,141 @@
+"""Cliente Supabase único do processo, com timeout, novas tentativas e métricas.
+
+`ClienteInstrumentado` embrulha o cliente oficial: `table(...)` devolve o mesmo
+construtor de consultas de sempre, mas o `execute()` passa a medir o tempo de
+cada chamada, repetir falhas de rede com backoff e contar erros por
+"tabela.operação". Como o cliente é criado uma vez por processo, as conexões
+HTTP (keep-alive) são reaproveitadas entre reruns e sessões.
+
+O pacote `supabase` só é importado (e o cliente só é criado) na primeira
+consulta, para não pesar no cold start quando o corpus vem do snapshot.
+"""
+import threading
+import time
+
+TIMEOUT = 10
+TENTATIVAS = 3
+ESPERA_INICIAL = 0.3
+OPERACOES = {"select", "insert", "upsert", "update", "delete"}
+
+
+def criar_cliente(url, chave, timeout=TIMEOUT, monitor=None):
+    def fabricar():
+        from supabase import create_client
+        try:
+            from supabase import ClientOptions
+        except ImportError:
+            from supabase.lib.client_options import ClientOptions
+        return create_client(url, chave, options=ClientOptions(postgrest_client_timeout=timeout))
+    return ClienteInstrumentado(fabrica=fabricar, monitor=monitor)
+
+
+class MetricasConsultas:
+    """Contadores de latência e erro por rótulo de consulta."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.por_rotulo = {}
+
+    def registrar(self, rotulo, duracao, erro=False, repeticoes=0):
+        with self._lock:
+            m = self.por_rotulo.setdefault(rotulo, {"chamadas": 0, "erros": 0, "repeticoes": 0, "total_s": 0.0, "max_s": 0.0})
+            m["chamadas"] += 1
+            m["erros"] += int(erro)
+            m["repeticoes"] += repeticoes
+            m["total_s"] += duracao
+            m["max_s"] = max(m["max_s"], duracao)
+
+    def resumo(self):
+        with self._lock:
+            linhas = [
+                {"consulta": rotulo, **m, "media_ms": round(1000 * m["total_s"] / m["chamadas"], 1)}
+                for rotulo, m in self.por_rotulo.items()
+            ]
+        return sorted(linhas, key=lambda m: m["total_s"], reverse=True)
+
+
+def _pode_repetir(erro, idempotente):
+    import httpx
+
+    if isinstance(erro, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        # A requisição nem saiu: é seguro repetir qualquer operação.
+        return True
+    return idempotente and isinstance(erro, httpx.TransportError)
+
+
+class ClienteInstrumentado:
+    def __init__(self, cliente=None, tentativas=TENTATIVAS, espera_inicial=ESPERA_INICIAL, monitor=None, fabrica=None):
+        self._cliente = cliente
+        self._fabrica = fabrica
+        self._lock = threading.Lock()
+        self.monitor = monitor
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.metricas = MetricasConsultas()
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    self._cliente = self._fabrica()
+        return self._cliente
+
+    def table(self, nome):
+        return _Consulta(self, nome, self.cliente.table(nome))
+
+    def rpc(self, funcao, parametros=None):
+        return _Consulta(self, funcao, self.cliente.rpc(funcao, parametros or {}), operacao="rpc")
+
+    def __getattr__(self, nome):
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self.cliente, nome)
+
+    def executar(self, consulta, rotulo, idempotente=True):
+        inicio = time.perf_counter()
+        for tentativa in range(self.tentativas):
+            try:
+                resultado = consulta.execute()
+            except Exception as e:
+                if tentativa == self.tentativas - 1 or not _pode_repetir(e, idempotente):
+                    self._registrar(rotulo, time.perf_counter() - inicio, erro=True, repeticoes=tentativa)
+                    raise
+                time.sleep(self.espera_inicial * 2 ** tentativa)
+            else:
+                self._registrar(rotulo, time.perf_counter() - inicio, repeticoes=tentativa)
+                return resultado
+
+    def _registrar(self, rotulo, duracao, erro=False, repeticoes=0):
+        self.metricas.registrar(rotulo, duracao, erro, repeticoes)
+        if self.monitor:
+            self.monitor.registrar(f"supabase.{rotulo}", duracao * 1000, erro)
+
+
+class _Consulta:
+    """Repassa os métodos do construtor do postgrest e intercepta o `execute()`."""
+
+    def __init__(self, cliente, tabela, construtor, operacao="select"):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._construtor = construtor
+        self._operacao = operacao
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._construtor, nome)
+        operacao = nome if nome in OPERACOES else self._operacao
+        if not callable(atributo):
+            return self._embrulhar(atributo, operacao)
+
+        def chamar(*args, **kwargs):
+            return self._embrulhar(atributo(*args, **kwargs), operacao)
+        return chamar
+
+    def _embrulhar(self, valor, operacao):
+        if hasattr(valor, "execute"):
+            return _Consulta(self._cliente, self._tabela, valor, operacao)
+        return valor
+
+    def execute(self):
+        return self._cliente.executar(
+            self._construtor, f"{self._tabela}.{self._operacao}", idempotente=self._operacao not in ("insert", "rpc"))
@@ -0,0 +1 @@
+"""Benchmarks offline: `python -m benchmark --help`."""
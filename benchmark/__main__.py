@@ -0,0 +1,164 @@
+"""Benchmarks offline do Gupy Frases.
+
+Uso (na raiz do projeto):
+
+    python -m benchmark --tamanhos 1000 10000 100000 --saida resultados.json
+    python -m benchmark --tamanhos 1000 --comparar resultados.json --tolerancia 0.25
+
+Os casos exercitam o mesmo código que as telas chamam (o app em si depende do
+Streamlit e não é importado): carga do corpus, `buscar_frases_final`
+(`IndiceBusca.pagina`), cascata de filtros da Biblioteca, importação de
+Excel, mensagens em lote, exportação de backup, login (cache de usuários + hash de senha) e
+validação do token de sessão. Com `--comparar`, o
+processo termina com código 1 se algum caso ficar mais lento que a base além
+da tolerância, para barrar regressões antes do deploy.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from autenticacao import Autenticador
+from backup import FORMATOS, exportar
+from benchmark.cliente_local import ClienteLocal
+from benchmark.gerador import gerar_candidatos, gerar_frases, gerar_planilha, gerar_usuarios
+from corpus import CorpusSincronizado
+from importacao import importar_planilha
+from modelos import compilar, gerar_lote
+
+TERMOS = ["", "recusa", "qualif", "agradecemos interesse", "banco aurora", "entrevista agendada"]
+MAX_LINHAS_IMPORTACAO = 20000
+
+
+def medir(funcao, repeticoes, preparar=None):
+    tempos = []
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcao(argumento) if preparar else funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "p50_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(0.95 * len(tempos)))], 3),
+        "min_ms": round(tempos[0], 3),
+        "max_ms": round(tempos[-1], 3),
+    }
+
+
+def novo_cliente(frases, latencia):
+    return ClienteLocal({"frases": [dict(f) for f in frases], "usuarios": gerar_usuarios(), "logs": []}, latencia=latencia)
+
+
+def casos(tamanho, repeticoes, latencia):
+    frases = gerar_frases(tamanho)
+    cliente = novo_cliente(frases, latencia)
+    corpus = CorpusSincronizado(cliente)
+    leves = repeticoes * 10
+
+    yield "carga_corpus", medir(lambda: CorpusSincronizado(cliente).sincronizar(), max(1, repeticoes // 2))
+    corpus.sincronizar()
+    indice = corpus.indice
+
+    def buscar():
+        for termo in TERMOS:
+            indice.pagina(termo or None, "Todas", "Todos", 8)
+    yield "buscar_frases_final", medir(buscar, leves)
+
+    rnd = random.Random(7)
+    popularidade = {rnd.randrange(1, tamanho + 1): rnd.random() for _ in range(tamanho // 5)}
+
+    def buscar_mais_usadas():
+        for termo in TERMOS:
+            indice.pagina(termo or None, "Todas", "Todos", 8, popularidade=popularidade)
+    yield "buscar_mais_usadas", medir(buscar_mais_usadas, leves)
+
+    empresa, documento = frases[0]["empresa"], frases[0]["documento"]
+
+    def cascata():
+        for termo in TERMOS:
+            pontos = indice.buscar(termo)
+            contagens = indice.contagens(pontos)
+            sorted(e for e in contagens if e)
+            sorted({d for docs in contagens.values() for d in docs})
+            indice.pagina(termo or None, empresa, documento, 8)
+    yield "cascata_filtros", medir(cascata, leves)
+
+    linhas = min(tamanho, MAX_LINHAS_IMPORTACAO)
+    planilha = gerar_planilha(linhas).getvalue()
+    yield f"importar_excel_{linhas}", medir(
+        lambda c: importar_planilha(c, io.BytesIO(planilha), "benchmark"),
+        max(1, repeticoes // 2), preparar=lambda: novo_cliente(frases, latencia))
+
+    candidatos = gerar_candidatos(linhas).getvalue()
+    modelo = compilar(next((f["conteudo"] for f in frases if "{" in f["conteudo"]), "Olá, {candidato}! Vaga de {vaga}."))
+    yield f"mensagens_lote_{linhas}", medir(
+        lambda: gerar_lote(modelo, io.BytesIO(candidatos), "candidatos.xlsx", "csv")[0].close(), max(1, repeticoes // 2))
+
+    for formato in FORMATOS:
+        yield f"exportar_backup_{formato}", medir(lambda f=formato: exportar(cliente, f)[0].close(), max(1, repeticoes // 2))
+
+    autenticador = Autenticador(cliente, "benchmark")
+    autenticador.definir_senha(25, "recrutador25", "senha25")
+    yield "login", medir(lambda: autenticador.login("recrutador25", "senha25"), repeticoes)
+    token = autenticador.emitir_token({"username": "recrutador25"})
+    yield "sessao_token", medir(lambda: autenticador.usuario_do_token(token), leves)
+
+
+def comparar(resultados, base, tolerancia):
+    anteriores = {(r["caso"], r["tamanho"]): r for r in base["resultados"]}
+    regressoes = []
+    for r in resultados:
+        anterior = anteriores.get((r["caso"], r["tamanho"]))
+        if anterior and r["p50_ms"] > anterior["p50_ms"] * (1 + tolerancia):
+            regressoes.append(f"{r['caso']} @ {r['tamanho']}: {anterior['p50_ms']} ms -> {r['p50_ms']} ms")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="latência simulada por chamada ao banco")
+    parser.add_argument("--saida", help="arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior usado como base")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for tamanho in args.tamanhos:
+        for caso, medida in casos(tamanho, args.repeticoes, args.latencia_ms / 1000):
+            resultados.append({"caso": caso, "tamanho": tamanho, **medida})
+            print(f"{caso:<28} {tamanho:>7}  p50 {medida['p50_ms']:>10.3f} ms  p95 {medida['p95_ms']:>10.3f} ms", file=sys.stderr)
+
+    relatorio = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "latencia_ms": args.latencia_ms,
+        "resultados": resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO: {regressao}", file=sys.stderr)
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""Substituto local do cliente Supabase para medir o app sem rede.
+
+Implementa o pedaço da API do postgrest que o app usa (select, eq, neq, gt,
+gte, lt, or_, ilike, order, limit, range, insert, upsert, update, delete,
+execute e o rpc `registrar_uso`) sobre listas em memória. `latencia` simula o tempo de ida e volta de
+cada `execute()` e `max_linhas` imita o corte de linhas do PostgREST. Na
+tabela `frases`, o `updated_at` segue o default e o gatilho descritos em
+corpus.py (now() ao inserir sem valor e a cada update) e, se existir a tabela
+`frases_removidas`, cada remoção deixa a lápide do gatilho `frases_lapide`.
+"""
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+def _como_regex(padrao):
+    partes = (re.escape(p) for p in str(padrao).split("%"))
+    return re.compile("^" + ".*".join(partes) + "$", re.IGNORECASE | re.DOTALL)
+
+
+def _agora():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _tocar(tabela, registro, sempre):
+    if tabela == "frases" and (sempre or not registro.get("updated_at")):
+        registro["updated_at"] = _agora()
+
+
+def _comparavel(valor):
+    return (valor is None, str(valor) if not isinstance(valor, (int, float)) else valor)
+
+
+def _dividir(expressao):
+    """Separa as condições de um filtro `or`/`and` do PostgREST nas vírgulas de primeiro nível."""
+    partes, atual, nivel, aspas = [], "", 0, False
+    for c in expressao:
+        if c == '"':
+            aspas = not aspas
+        elif not aspas and c in "()":
+            nivel += 1 if c == "(" else -1
+        elif c == "," and not aspas and not nivel:
+            partes.append(atual)
+            atual = ""
+            continue
+        atual += c
+    return partes + [atual]
+
+
+def _condicao(texto):
+    if texto.startswith("and(") and texto.endswith(")"):
+        condicoes = [_condicao(p) for p in _dividir(texto[4:-1])]
+        return lambda r: all(c(r) for c in condicoes)
+    coluna, operador, valor = texto.split(".", 2)
+    valor = valor[1:-1] if valor.startswith('"') and valor.endswith('"') else valor
+    if operador == "ilike":
+        regex = _como_regex(valor)
+        return lambda r: bool(regex.match(str(r.get(coluna) or "")))
+    comparar = {"eq": lambda a, b: a == b, "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+                "lt": lambda a, b: a < b}.get(operador)
+    if comparar is None:
+        raise NotImplementedError(f"or_ com operador {operador}")
+    # Os valores chegam como texto na URL; ids são comparados como número.
+    return lambda r: r.get(coluna) is not None and comparar(
+        _comparavel(r[coluna]), _comparavel(int(valor) if isinstance(r[coluna], int) else valor))
+
+
+class _Consulta:
+    def __init__(self, banco, tabela):
+        self._banco = banco
+        self._tabela = tabela
+        self._colunas = None
+        self._filtros = []
+        self._ordem = []
+        self._limite = None
+        self._faixa = None
+        self._operacao = ("select", None)
+
+    # --- leitura ---
+    def select(self, colunas="*", **_):
+        if colunas.strip() != "*":
+            self._colunas = [c.strip() for c in colunas.split(",")]
+        return self
+
+    def _filtro(self, funcao):
+        self._filtros.append(funcao)
+        return self
+
+    def eq(self, coluna, valor):
+        return self._filtro(lambda r: str(r.get(coluna)) == str(valor))
+
+    def neq(self, coluna, valor):
+        return self._filtro(lambda r: str(r.get(coluna)) != str(valor))
+
+    def gt(self, coluna, valor):
+        return self._filtro(lambda r: r.get(coluna) is not None and _comparavel(r[coluna]) > _comparavel(valor))
+
+    def gte(self, coluna, valor):
+        return self._filtro(lambda r: r.get(coluna) is not None and _comparavel(r[coluna]) >= _comparavel(valor))
+
+    def lt(self, coluna, valor):
+        return self._filtro(lambda r: r.get(coluna) is not None and _comparavel(r[coluna]) < _comparavel(valor))
+
+    def in_(self, coluna, valores):
+        valores = {str(v) for v in valores}
+        return self._filtro(lambda r: str(r.get(coluna)) in valores)
+
+    def ilike(self, coluna, padrao):
+        regex = _como_regex(padrao)
+        return self._filtro(lambda r: bool(regex.match(str(r.get(coluna) or ""))))
+
+    def or_(self, expressao):
+        condicoes = [_condicao(p) for p in _dividir(expressao)]
+        return self._filtro(lambda r: any(c(r) for c in condicoes))
+
+    def order(self, coluna, desc=False):
+        self._ordem.append((coluna, desc))
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def range(self, inicio, fim):
+        self._faixa = (inicio, fim)
+        return self
+
+    # --- escrita ---
+    def insert(self, dados, **_):
+        self._operacao = ("insert", dados)
+        return self
+
+    def upsert(self, dados, **_):
+        self._operacao = ("upsert", dados)
+        return self
+
+    def update(self, dados):
+        self._operacao = ("update", dados)
+        return self
+
+    def delete(self):
+        self._operacao = ("delete", None)
+        return self
+
+    def execute(self):
+        if self._banco.latencia:
+            time.sleep(self._banco.latencia)
+        with self._banco.lock:
+            return SimpleNamespace(data=self._executar())
+
+    def _executar(self):
+        linhas = self._banco.tabelas.setdefault(self._tabela, [])
+        operacao, dados = self._operacao
+        if operacao in ("insert", "upsert"):
+            return self._banco.gravar(self._tabela, dados if isinstance(dados, list) else [dados], operacao == "upsert")
+        selecionadas = [r for r in linhas if all(f(r) for f in self._filtros)]
+        if operacao == "update":
+            for r in selecionadas:
+                r.update(dados)
+                _tocar(self._tabela, r, sempre=True)
+            return [dict(r) for r in selecionadas]
+        if operacao == "delete":
+            ids = {id(r) for r in selecionadas}
+            linhas[:] = [r for r in linhas if id(r) not in ids]
+            if self._tabela == "frases" and "frases_removidas" in self._banco.tabelas:
+                self._banco.gravar("frases_removidas", [
+                    {"frase_id": r["id"], "removido_em": _agora()} for r in selecionadas], upsert=True, chave="frase_id")
+            return [dict(r) for r in selecionadas]
+        for coluna, desc in reversed(self._ordem):
+            selecionadas.sort(key=lambda r: _comparavel(r.get(coluna)), reverse=desc)
+        if self._faixa:
+            selecionadas = selecionadas[self._faixa[0]:self._faixa[1] + 1]
+        if self._limite is not None:
+            selecionadas = selecionadas[:self._limite]
+        selecionadas = selecionadas[:self._banco.max_linhas]
+        if self._colunas:
+            return [{c: r.get(c) for c in self._colunas} for r in selecionadas]
+        return [dict(r) for r in selecionadas]
+
+
+class _Chamada:
+    def __init__(self, banco, funcao, parametros):
+        self._banco = banco
+        self._funcao = funcao
+        self._parametros = parametros
+
+    def execute(self):
+        if self._banco.latencia:
+            time.sleep(self._banco.latencia)
+        with self._banco.lock:
+            return SimpleNamespace(data=self._funcao(**self._parametros))
+
+
+class ClienteLocal:
+    def __init__(self, tabelas=None, latencia=0.0, max_linhas=1000):
+        self.tabelas = tabelas or {}
+        self.latencia = latencia
+        self.max_linhas = max_linhas
+        self.lock = threading.Lock()
+        self._proximo_id = {}
+
+    def table(self, nome):
+        return _Consulta(self, nome)
+
+    def rpc(self, funcao, parametros=None):
+        return _Chamada(self, getattr(self, f"_rpc_{funcao}"), parametros or {})
+
+    def _rpc_registrar_uso(self, eventos):
+        """Mesma soma da função SQL descrita em uso.py."""
+        linhas = self.tabelas.setdefault("frases_uso", [])
+        por_id = {r["frase_id"]: r for r in linhas}
+        existentes = {r["id"] for r in self.tabelas.get("frases", [])}
+        agora = _agora()
+        for evento in eventos:
+            if evento["frase_id"] not in existentes:
+                continue
+            linha = por_id.get(evento["frase_id"])
+            if linha is None:
+                linha = por_id[evento["frase_id"]] = {"frase_id": evento["frase_id"], "copias": 0, "visualizacoes": 0, "pontuacao": 0.0}
+                linhas.append(linha)
+            for campo in ("copias", "visualizacoes", "pontuacao"):
+                linha[campo] += evento[campo]
+            linha["atualizado_em"] = agora
+
+    def gravar(self, tabela, registros, upsert=False, chave="id"):
+        linhas = self.tabelas.setdefault(tabela, [])
+        if chave != "id":
+            # Upsert por outra chave (sem id gerado), como o `on conflict` da lápide.
+            por_chave = {r.get(chave): r for r in linhas}
+            for registro in registros:
+                if registro[chave] in por_chave:
+                    por_chave[registro[chave]].update(registro)
+                else:
+                    linhas.append(por_chave.setdefault(registro[chave], dict(registro)))
+            return [dict(por_chave[r[chave]]) for r in registros]
+        por_id = {r.get("id"): r for r in linhas} if upsert else {}
+        proximo = self._proximo_id.get(tabela) or max((r.get("id") or 0 for r in linhas), default=0) + 1
+        gravados = []
+        for registro in registros:
+            registro = dict(registro)
+            if registro.get("id") not in (None, ""):
+                # Como o Postgres, converte o id vindo de CSV (texto) para número.
+                registro["id"] = int(registro["id"])
+            else:
+                registro.pop("id", None)
+            if registro.get("id") in por_id:
+                por_id[registro["id"]].update(registro)
+                _tocar(tabela, por_id[registro["id"]], sempre=True)
+                gravados.append(dict(por_id[registro["id"]]))
+                continue
+            if registro.get("id") is None:
+                registro["id"] = proximo
+            proximo = max(proximo, int(registro["id"]) + 1)
+            _tocar(tabela, registro, sempre=False)
+            linhas.append(registro)
+            gravados.append(dict(registro))
+        self._proximo_id[tabela] = proximo
+        return gravados
@@ -0,0 +1,87 @@
+"""Gerador de corpus sintético de frases em português para os benchmarks."""
+import io
+import random
+from datetime import datetime, timedelta, timezone
+
+import openpyxl
+
+EMPRESAS = [
+    "Gupy Tech", "Banco Aurora", "Varejo Horizonte", "Construtora Alicerce", "Saúde Integral",
+    "Logística Rota Sul", "Educa Mais", "Agro Cerrado", "Energia Solaris", "Seguros Âncora",
+    "Farmácia Vida", "Telecom Conecta", "Indústria Metalúrgica Forja", "Café Serra Azul", "Moda Ateliê",
+]
+DOCUMENTOS = ["Carta Recusa", "E-mail Aprovação", "Convite Entrevista", "Feedback Teste", "Proposta", "Geral"]
+MOTIVOS = [
+    "Baixa Qualificação", "Perfil Técnico", "Pretensão Salarial", "Vaga Cancelada", "Aprovado Etapa",
+    "Ausência na Entrevista", "Localização", "Experiência Insuficiente", "Fit Cultural", "Documentação Pendente",
+]
+ABERTURAS = [
+    "Olá, {candidato}!", "Prezado(a) {candidato},", "Oi, {candidato}, tudo bem?", "Boa tarde, {candidato}.",
+]
+CORPOS = [
+    "Agradecemos muito o seu interesse na vaga de {vaga} na {empresa}.",
+    "Foi um prazer conhecer sua trajetória durante o processo seletivo.",
+    "Após análise cuidadosa, decidimos seguir com candidatos cujo perfil está mais alinhado à posição.",
+    "Sua experiência chamou a atenção do time e gostaríamos de avançar para a próxima etapa.",
+    "Infelizmente a vaga foi cancelada por mudanças no planejamento da área.",
+    "Sua pretensão salarial está acima da faixa prevista para esta oportunidade.",
+    "Pedimos que envie a documentação pendente até o fim da semana.",
+    "Notamos que você não compareceu à entrevista agendada; caso ainda tenha interesse, responda este e-mail.",
+    "Seu currículo continuará em nosso banco de talentos para futuras oportunidades.",
+    "Ficamos à disposição para qualquer dúvida sobre o processo.",
+]
+FECHAMENTOS = ["Atenciosamente, equipe de Recrutamento.", "Um abraço, time de Gente & Gestão.", "Sucesso na sua jornada!"]
+
+
+def gerar_frases(n, semente=42, inicio_id=1):
+    """Lista de `n` frases no formato da tabela `frases`."""
+    rnd = random.Random(semente)
+    base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    frases = []
+    for i in range(n):
+        empresa = rnd.choice(EMPRESAS)
+        corpo = " ".join(rnd.sample(CORPOS, rnd.randint(2, 5)))
+        conteudo = f"{rnd.choice(ABERTURAS)} {corpo} {rnd.choice(FECHAMENTOS)}".replace("{empresa}", empresa)
+        frases.append({
+            "id": inicio_id + i, "empresa": empresa, "documento": rnd.choice(DOCUMENTOS),
+            "motivo": rnd.choice(MOTIVOS), "conteudo": conteudo, "revisado_por": "benchmark",
+            "data_revisao": f"2024-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "updated_at": (base + timedelta(seconds=i)).isoformat(),
+        })
+    return frases
+
+
+def gerar_planilha(n, semente=7, taxa_duplicadas=0.1):
+    """Planilha .xlsx em memória com `n` linhas, parte delas repetida."""
+    frases = gerar_frases(n, semente)
+    rnd = random.Random(semente)
+    livro = openpyxl.Workbook(write_only=True)
+    aba = livro.create_sheet()
+    aba.append(["empresa", "documento", "motivo", "conteudo"])
+    for frase in frases:
+        if rnd.random() < taxa_duplicadas:
+            frase = rnd.choice(frases)
+        aba.append([frase["empresa"], frase["documento"], frase["motivo"], frase["conteudo"]])
+    saida = io.BytesIO()
+    livro.save(saida)
+    saida.seek(0)
+    return saida
+
+
+def gerar_candidatos(n, semente=7):
+    """Planilha .xlsx de candidatos (candidato, vaga) para o envio em lote."""
+    rnd = random.Random(semente)
+    vagas = ["Analista de Dados", "Desenvolvedor Backend", "Vendedor", "Assistente Administrativo", "Enfermeiro"]
+    livro = openpyxl.Workbook(write_only=True)
+    aba = livro.create_sheet()
+    aba.append(["candidato", "vaga"])
+    for i in range(n):
+        aba.append([f"Candidato {i}", rnd.choice(vagas)])
+    saida = io.BytesIO()
+    livro.save(saida)
+    saida.seek(0)
+    return saida
+
+
+def gerar_usuarios(n=50):
+    return [{"id": i, "username": f"recrutador{i}", "senha": f"senha{i}", "admin": i == 1} for i in range(1, n + 1)]
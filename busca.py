@@ -0,0 +1,207 @@
+"""Índice invertido em memória usado pela Biblioteca de frases.
+
+Os termos são normalizados (minúsculas, sem acentos) para que "recusa",
+"Recusa" e "recúsa" caiam no mesmo token. A busca aceita prefixos ("qualif"
+encontra "qualificação") e ordena os resultados por relevância.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+# Peso de cada campo na relevância: bater na empresa vale mais que no texto.
+PESOS_CAMPOS = {"empresa": 3.0, "motivo": 2.0, "documento": 1.5, "conteudo": 1.0}
+# Um token que só casa por prefixo pontua menos que um token exato.
+PESO_PREFIXO = 0.5
+
+_RE_TOKEN = re.compile(r"\w+")
+# Acentos que sobram depois da decomposição NFKD (removidos via regex, bem mais rápido que char a char).
+_RE_ACENTOS = re.compile(r"[\u0300-\u036f]")
+
+
+def normalizar(texto):
+    texto = str(texto or "").lower()
+    if texto.isascii():
+        return texto
+    return _RE_ACENTOS.sub("", unicodedata.normalize("NFKD", texto))
+
+
+def tokenizar(texto):
+    return _RE_TOKEN.findall(normalizar(texto))
+
+
+def pesos_tokens(frase):
+    """{token: peso} de uma frase, somando o peso de cada campo em que o token aparece."""
+    pesos = defaultdict(float)
+    for campo, peso in PESOS_CAMPOS.items():
+        for token in tokenizar(frase.get(campo)):
+            pesos[token] += peso
+    return pesos
+
+
+class IndiceBusca:
+    """Índice token -> {id: peso} com vocabulário ordenado para busca por prefixo.
+
+    É compartilhado entre sessões e atualizado em segundo plano pela
+    sincronização, por isso todo acesso passa pelo mesmo lock.
+
+    Com `postings` (o índice já montado por outro processo, ver snapshot.py)
+    as frases não são tokenizadas de novo; os tokens de cada uma só são
+    recalculados se ela for removida.
+    """
+
+    def __init__(self, frases=(), postings=None):
+        self._lock = threading.RLock()
+        self.frases = {}
+        self.postings = defaultdict(dict)
+        self.vocabulario = []
+        self._tokens_frase = {}
+        # Facetas pré-calculadas: empresa -> documento -> ids.
+        self.facetas = defaultdict(lambda: defaultdict(set))
+        if postings is None:
+            for frase in frases:
+                self.adicionar(frase)
+            return
+        self.postings.update(postings)
+        self.vocabulario = sorted(self.postings)
+        for frase in frases:
+            self.frases[frase["id"]] = frase
+            self.facetas[frase.get("empresa") or ""][frase.get("documento") or ""].add(frase["id"])
+
+    def __len__(self):
+        return len(self.frases)
+
+    def adicionar(self, frase):
+        with self._lock:
+            id_frase = frase["id"]
+            if id_frase in self.frases:
+                self.remover(id_frase)
+            pesos = pesos_tokens(frase)
+            for token, peso in pesos.items():
+                if token not in self.postings:
+                    bisect.insort(self.vocabulario, token)
+                self.postings[token][id_frase] = peso
+            self.frases[id_frase] = frase
+            self._tokens_frase[id_frase] = set(pesos)
+            self.facetas[frase.get("empresa") or ""][frase.get("documento") or ""].add(id_frase)
+
+    def remover(self, id_frase):
+        with self._lock:
+            if id_frase not in self.frases:
+                return
+            tokens = self._tokens_frase.pop(id_frase, None)
+            for token in pesos_tokens(self.frases[id_frase]) if tokens is None else tokens:
+                docs = self.postings[token]
+                docs.pop(id_frase, None)
+                if not docs:
+                    del self.postings[token]
+                    pos = bisect.bisect_left(self.vocabulario, token)
+                    if pos < len(self.vocabulario) and self.vocabulario[pos] == token:
+                        del self.vocabulario[pos]
+            frase = self.frases.pop(id_frase)
+            empresa, documento = frase.get("empresa") or "", frase.get("documento") or ""
+            docs = self.facetas[empresa]
+            docs[documento].discard(id_frase)
+            if not docs[documento]:
+                del docs[documento]
+                if not docs:
+                    del self.facetas[empresa]
+
+    def _expandir(self, token):
+        """Tokens do vocabulário que começam com `token`."""
+        pos = bisect.bisect_left(self.vocabulario, token)
+        while pos < len(self.vocabulario) and self.vocabulario[pos].startswith(token):
+            yield self.vocabulario[pos]
+            pos += 1
+
+    def buscar(self, termo):
+        """Retorna {id: relevância} das frases que casam com todos os tokens do termo.
+
+        Sem tokens (termo vazio) retorna None, que significa "todas as frases".
+        """
+        with self._lock:
+            tokens = tokenizar(termo)
+            if not tokens:
+                return None
+            resultado = None
+            for token in dict.fromkeys(tokens):
+                pontos = {}
+                for candidato in self._expandir(token):
+                    fator = 1.0 if candidato == token else PESO_PREFIXO
+                    for id_frase, peso in self.postings[candidato].items():
+                        pontos[id_frase] = max(pontos.get(id_frase, 0.0), peso * fator)
+                if resultado is None:
+                    resultado = pontos
+                else:
+                    resultado = {i: resultado[i] + p for i, p in pontos.items() if i in resultado}
+                if not resultado:
+                    return {}
+            return resultado
+
+    def _ids_faceta(self, empresa, documento):
+        """Ids da combinação empresa/documento, ou None quando não há filtro."""
+        if empresa == "Todas" and documento == "Todos":
+            return None
+        grupos = self.facetas.values() if empresa == "Todas" else [self.facetas.get(empresa, {})]
+        ids = set()
+        for docs in grupos:
+            if documento == "Todos":
+                for conjunto in docs.values():
+                    ids |= conjunto
+            elif documento in docs:
+                ids |= docs[documento]
+        return ids
+
+    def filtrar(self, ids=None, empresa="Todas", documento="Todos"):
+        with self._lock:
+            faceta = self._ids_faceta(empresa, documento)
+            if ids is None:
+                return list(self.frases if faceta is None else faceta)
+            base = self.frases if faceta is None else faceta
+            return [i for i in ids if i in base]
+
+    def contagens(self, ids=None):
+        """{empresa: {documento: n}} das frases em `ids` (ou de todas), sem varrer o corpus.
+
+        Cada célula é a interseção do conjunto pré-calculado com os ids da busca.
+        """
+        with self._lock:
+            if ids is not None and not isinstance(ids, (set, dict)):
+                ids = set(ids)
+            resultado = {}
+            for empresa, docs in self.facetas.items():
+                for documento, conjunto in docs.items():
+                    if ids is None:
+                        n = len(conjunto)
+                    else:
+                        menor, maior = (conjunto, ids) if len(conjunto) <= len(ids) else (ids, conjunto)
+                        n = sum(1 for i in menor if i in maior)
+                    if n:
+                        resultado.setdefault(empresa, {})[documento] = n
+            return resultado
+
+    def pagina(self, termo=None, empresa="Todas", documento="Todos", limite=8, apos=None, popularidade=None):
+        """Uma página de resultados, por relevância e depois pelos ids mais recentes.
+
+        Com `popularidade` (id -> pontuação de uso), o desempate antes do id é
+        pela frase mais usada; sem termo, é essa a ordem da lista.
+
+        A paginação é por chave (keyset): `apos` é a chave devolvida pela página
+        anterior. Retorna (frases, total de resultados, chave para a próxima
+        página ou None quando não há mais).
+        """
+        with self._lock:
+            pontos = self.buscar(termo)
+            ids = self.filtrar(pontos, empresa, documento)
+            pontos = pontos or {}
+
+            def chave(i):
+                if popularidade is not None:
+                    return (-pontos.get(i, 0.0), -popularidade.get(i, 0.0), -i)
+                return (-pontos.get(i, 0.0), -i)
+            restantes = ids if apos is None else (i for i in ids if chave(i) > apos)
+            topo = heapq.nsmallest(limite + 1, restantes, key=chave)
+            proxima = chave(topo[limite - 1]) if len(topo) > limite else None
+            return [self.frases[i] for i in topo[:limite]], len(ids), proxima
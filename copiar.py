@@ -0,0 +1,23 @@
+"""Botão de copiar que avisa o app quando é clicado.
+
+O `st_copy_to_clipboard` copia só no navegador e não devolve nada ao Python,
+então não dá para contar as cópias. Este componente (HTML puro em
+`componente_copiar/`) devolve um valor novo a cada clique.
+"""
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+_componente = components.declare_component(
+    "copiar", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "componente_copiar"))
+
+
+def botao_copiar(texto, rotulo="📋 Copiar", rotulo_copiado="✅", key=None):
+    """Desenha o botão; retorna True só no rerun disparado por um clique."""
+    valor = _componente(texto=texto, rotulo=rotulo, rotulo_copiado=rotulo_copiado, key=key, default=None)
+    vistos = st.session_state.setdefault("_copias_vistas", {})
+    if valor is None or vistos.get(key) == valor:
+        return False
+    vistos[key] = valor
+    return True
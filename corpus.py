@@ -0,0 +1,318 @@
+"""Cópia local do corpus de frases, sincronizada por delta com o Supabase.
+
+A primeira carga pagina a tabela inteira por id. Depois disso só são buscadas
+as linhas alteradas desde a última marca d'água (`updated_at`) e as remoções
+registradas em `frases_removidas`. Para isso o banco precisa de:
+
+    alter table frases add column if not exists updated_at timestamptz not null default now();
+    create table if not exists frases_removidas (
+        frase_id bigint primary key,
+        removido_em timestamptz not null default now()
+    );
+
+    create or replace function frases_tocar() returns trigger as $$
+    begin new.updated_at = now(); return new; end $$ language plpgsql;
+    create trigger frases_tocar before update on frases
+        for each row execute function frases_tocar();
+
+    create or replace function frases_lapide() returns trigger as $$
+    begin
+        insert into frases_removidas (frase_id) values (old.id)
+        on conflict (frase_id) do update set removido_em = now();
+        return old;
+    end $$ language plpgsql;
+    create trigger frases_lapide after delete on frases
+        for each row execute function frases_lapide();
+
+Sem essas colunas a sincronização continua funcionando, mas cada atualização
+volta a ser uma carga completa (paginada).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+import snapshot
+from busca import IndiceBusca
+
+# O PostgREST corta respostas em 1000 linhas por padrão.
+TAMANHO_PAGINA = 1000
+# Intervalo mínimo entre duas consultas de delta disparadas pela leitura.
+INTERVALO_SYNC = 30
+
+
+def paginar_por_id(montar_query, tamanho=TAMANHO_PAGINA):
+    """Percorre uma consulta em páginas por id crescente (keyset), sem offset."""
+    ultimo_id = None
+    while True:
+        query = montar_query().order("id")
+        if ultimo_id is not None:
+            query = query.gt("id", ultimo_id)
+        pagina = query.limit(tamanho).execute().data or []
+        yield from pagina
+        if len(pagina) < tamanho:
+            return
+        ultimo_id = pagina[-1]["id"]
+
+
+def paginar_por_marca(montar_query, coluna, chave="id", tamanho=TAMANHO_PAGINA):
+    """Percorre uma consulta em páginas por (`coluna`, `chave`) crescentes (keyset).
+
+    Com offset, uma linha alterada durante a leitura sai do meio da ordem e
+    empurra a seguinte para a página já lida, que fica de fora. Aqui cada
+    página começa depois da última linha vista, então nada é pulado.
+    """
+    ultima = None
+    while True:
+        query = montar_query().order(coluna).order(chave)
+        if ultima is not None:
+            marca, id_ = ultima[coluna], ultima[chave]
+            query = query.or_(f'{coluna}.gt."{marca}",and({coluna}.eq."{marca}",{chave}.gt.{id_})')
+        pagina = query.limit(tamanho).execute().data or []
+        yield from pagina
+        if len(pagina) < tamanho:
+            return
+        ultima = pagina[-1]
+
+
+class CorpusSincronizado:
+    """Índice de busca do processo mantido em dia por consultas incrementais.
+
+    As telas que gravam no banco repassam as linhas afetadas para `aplicar`/
+    `remover`, então a mudança aparece para todas as sessões sem recarga.
+    `versao` sobe a cada alteração e serve de chave para o que for derivado do índice.
+    """
+
+    def __init__(self, cliente, intervalo=INTERVALO_SYNC, arquivo_snapshot=None, ler_snapshot_valido=True):
+        self.cliente = cliente
+        self.intervalo = intervalo
+        # Com `arquivo_snapshot`, a primeira carga vem do arquivo local e, enquanto o
+        # atualizador o mantiver fresco, as seguintes também (ver snapshot.py).
+        self.arquivo_snapshot = arquivo_snapshot
+        self.ler_snapshot_valido = ler_snapshot_valido
+        self._snapshot_lido = None
+        self.indice = IndiceBusca()
+        self._similaridade = None
+        # Mudanças que chegam enquanto o índice de similaridade é montado (fora do lock).
+        self._durante_montagem = None
+        self._montagem = threading.Lock()
+        self._preparando = None
+        self._agrupamentos = {}
+        self._agrupando = None
+        self.versao = 0
+        self.marca_frases = None
+        self.marca_remocoes = None
+        self.ultima_sync = 0.0
+        self._lock = threading.Lock()
+
+    def sincronizar(self, forcar=False):
+        """Aplica as mudanças do banco ao índice. Retorna True se algo mudou."""
+        # Checa o intervalo antes do lock: dentro dele, os reruns não esperam uma sync em andamento.
+        if not forcar and self._recente():
+            return False
+        with self._lock:
+            if not forcar and self._recente():
+                return False
+            mudou = False
+            if self.arquivo_snapshot and self._snapshot_lido is None and os.path.exists(self.arquivo_snapshot):
+                mudou = self._carga_snapshot()
+            if self.arquivo_snapshot and self.ler_snapshot_valido and snapshot.valido(self.arquivo_snapshot):
+                mudou = self._carga_snapshot() or mudou
+            elif self.marca_frases is None and not mudou:
+                mudou = self._carga_completa()
+            else:
+                try:
+                    mudou = self._carga_delta() or mudou
+                except Exception:
+                    mudou = self._carga_completa()
+            self.ultima_sync = time.monotonic()
+            if mudou:
+                self.versao += 1
+            return mudou
+
+    def _recente(self):
+        return self.ultima_sync and time.monotonic() - self.ultima_sync < self.intervalo
+
+    def aplicar(self, frases):
+        """Grava no índice as linhas devolvidas por um insert/update (write-through)."""
+        with self._lock:
+            for frase in frases:
+                self._gravar(frase)
+            if frases:
+                self.versao += 1
+
+    def remover(self, ids):
+        with self._lock:
+            for id_frase in ids:
+                self._apagar(id_frase)
+            if ids:
+                self.versao += 1
+
+    def esvaziar(self):
+        self.remover(list(self.indice.frases))
+
+    def similaridade(self, esperar=True):
+        """Índice de quase duplicados, montado só na primeira vez que alguém precisa dele.
+
+        A montagem (segundos para milhares de frases) roda fora do lock do corpus:
+        sincronizações e gravações seguem, e o que mudar nesse meio tempo é
+        reaplicado no índice novo antes de publicá-lo. Com `esperar=False`,
+        devolve None enquanto o índice não fica pronto (e dispara a montagem em
+        segundo plano) em vez de segurar a requisição.
+        """
+        if self._similaridade is not None:
+            return self._similaridade
+        if not esperar:
+            self.preparar_similaridade()
+            return None
+        with self._montagem:
+            if self._similaridade is None:
+                from similaridade import IndiceSimilaridade
+
+                with self._lock:
+                    frases = list(self.indice.frases.values())
+                    self._durante_montagem = []
+                novo = IndiceSimilaridade(frases)
+                with self._lock:
+                    for metodo, valor in self._durante_montagem:
+                        getattr(novo, metodo)(valor)
+                    self._durante_montagem = None
+                    self._similaridade = novo
+            return self._similaridade
+
+    def preparar_similaridade(self):
+        """Monta o índice de quase duplicados numa thread, se ainda não existir."""
+        with self._lock:
+            if self._similaridade is not None or (self._preparando and self._preparando.is_alive()):
+                return
+            self._preparando = threading.Thread(target=self.similaridade, name="similaridade", daemon=True)
+            self._preparando.start()
+
+    def agrupar_parecidas(self, limiar):
+        """Dispara o agrupamento de quase duplicados numa thread à parte.
+
+        Retorna o último resultado pronto para `limiar` ({"grupos", "versao",
+        "segundos"}) ou None; `agrupando` diz se há um cálculo em andamento.
+        """
+        with self._lock:
+            pronto = self._agrupamentos.get(limiar)
+            if (pronto is None or pronto["versao"] != self.versao) and not self.agrupando:
+                self._agrupando = threading.Thread(
+                    target=self._agrupar, args=(limiar,), name="agrupar_parecidas", daemon=True)
+                self._agrupando.start()
+            return pronto
+
+    @property
+    def agrupando(self):
+        return self._agrupando is not None and self._agrupando.is_alive()
+
+    def _agrupar(self, limiar):
+        inicio, versao = time.perf_counter(), self.versao
+        grupos = self.similaridade().agrupar(limiar)
+        with self._lock:
+            self._agrupamentos[limiar] = {
+                "grupos": grupos, "versao": versao, "segundos": time.perf_counter() - inicio}
+
+    def _gravar(self, frase):
+        self.indice.adicionar(frase)
+        self._similar("adicionar", frase)
+
+    def _apagar(self, id_frase):
+        self.indice.remover(id_frase)
+        self._similar("remover", id_frase)
+
+    def _similar(self, metodo, valor):
+        if self._similaridade is not None:
+            getattr(self._similaridade, metodo)(valor)
+        elif self._durante_montagem is not None:
+            self._durante_montagem.append((metodo, valor))
+
+    def _trocar_indice(self, frases, postings=None):
+        """Publica um índice de busca montado do zero.
+
+        O de similaridade não é descartado: recebe só a diferença para o
+        anterior, então as assinaturas das frases que não mudaram são reaproveitadas.
+        """
+        antigo, self.indice = self.indice, IndiceBusca(frases, postings)
+        if self._similaridade is None and self._durante_montagem is None:
+            return
+        for id_frase in antigo.frases.keys() - self.indice.frases.keys():
+            self._similar("remover", id_frase)
+        for id_frase, frase in self.indice.frases.items():
+            if antigo.frases.get(id_frase) != frase:
+                self._similar("adicionar", frase)
+
+    def _carga_completa(self):
+        frases = list(paginar_por_id(lambda: self.cliente.table("frases").select("*")))
+        self.marca_frases = max((f["updated_at"] for f in frases if f.get("updated_at")), default=None)
+        self.marca_remocoes = self._ultima_remocao() if self.marca_frases else None
+        # Monta o índice novo por fora e troca de uma vez: leitores nunca veem meia carga.
+        self._trocar_indice(frases)
+        return True
+
+    def _carga_snapshot(self):
+        try:
+            con = snapshot.abrir(self.arquivo_snapshot)
+        except sqlite3.Error:
+            return False
+        try:
+            meta = snapshot.ler_meta(con)
+            if meta.get("gerado_em") == self._snapshot_lido:
+                return False
+            if not len(self.indice) or not self.marca_frases or not meta.get("marca_frases"):
+                self._trocar_indice(snapshot.ler_frases(con), snapshot.ler_postings(con))
+                mudou = True
+            else:
+                mudou = False
+                for frase in snapshot.ler_frases(con, desde=self.marca_frases):
+                    if self.indice.frases.get(frase["id"]) != frase:
+                        self._gravar(frase)
+                        mudou = True
+                # Ids acima do maior id do snapshot são inserções locais que ele ainda não viu.
+                max_id, ids = int(meta.get("max_id") or 0), snapshot.ler_ids(con)
+                for id_frase in [i for i in self.indice.frases if i <= max_id and i not in ids]:
+                    self._apagar(id_frase)
+                    mudou = True
+            self.marca_frases = meta.get("marca_frases")
+            self.marca_remocoes = meta.get("marca_remocoes")
+            self._snapshot_lido = meta.get("gerado_em")
+            return mudou
+        except sqlite3.Error:
+            return False
+        finally:
+            con.close()
+
+    def _ultima_remocao(self):
+        try:
+            res = (self.cliente.table("frases_removidas").select("removido_em")
+                   .order("removido_em", desc=True).limit(1).execute())
+            return res.data[0]["removido_em"] if res.data else ""
+        except Exception:
+            return None
+
+    def _carga_delta(self):
+        if self.marca_remocoes is None:
+            raise RuntimeError("Banco sem tabela de remoções; delta indisponível.")
+        # `gte` reaplica as linhas da fronteira, o que é inofensivo e evita perder
+        # alterações com o mesmo carimbo de tempo da marca anterior.
+        alteradas = list(paginar_por_marca(
+            lambda: self.cliente.table("frases").select("*").gte("updated_at", self.marca_frases), "updated_at"))
+        removidas = list(paginar_por_marca(
+            lambda: self.cliente.table("frases_removidas").select("frase_id, removido_em")
+            .gte("removido_em", self.marca_remocoes), "removido_em", "frase_id"))
+        mudou = False
+        for frase in alteradas:
+            if self.indice.frases.get(frase["id"]) != frase:
+                self._gravar(frase)
+                mudou = True
+            self.marca_frases = max(self.marca_frases, frase["updated_at"])
+        for lapide in removidas:
+            atual = self.indice.frases.get(lapide["frase_id"])
+            # Lápide mais velha que a linha viva é de uma remoção desfeita (ex.: backup
+            # restaurado): a frase voltou e fica. Sem isso, o `gte` reaplicaria a última
+            # lápide a cada sync e a frase sumiria de novo.
+            if atual is not None and lapide["removido_em"] > (atual.get("updated_at") or ""):
+                self._apagar(lapide["frase_id"])
+                mudou = True
+            self.marca_remocoes = max(self.marca_remocoes, lapide["removido_em"])
+        return mudou
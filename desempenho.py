@@ -0,0 +1,168 @@
+"""Instrumentação de desempenho em memória, exibida na aba Desempenho do Admin.
+
+Cada métrica guarda as últimas `JANELA` medições (janela móvel) e os
+percentis são calculados só quando alguém abre o painel. Há também contadores
+de acerto/falha de cache e um amostrador opcional que roda o cProfile nos
+reruns e guarda o perfil apenas dos que passarem do limite configurado.
+
+`marcar_inicio` guarda só a primeira medição de cada etapa no processo: é o
+retrato do cold start de uma réplica nova (imports, configuração, cliente,
+carga do corpus e primeira tela).
+"""
+import cProfile
+import csv
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+JANELA = 2000
+MAX_PERFIS = 10
+LIMITE_LENTO_MS = 2000
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class Monitor:
+    def __init__(self, janela=JANELA):
+        self._lock = threading.Lock()
+        self.janela = janela
+        self.amostras = defaultdict(lambda: deque(maxlen=self.janela))
+        self.erros = defaultdict(int)
+        self.cache = defaultdict(lambda: {"acertos": 0, "falhas": 0})
+        self.amostrador_ativo = False
+        self.limite_lento_ms = LIMITE_LENTO_MS
+        self.perfis = deque(maxlen=MAX_PERFIS)
+        self.inicio = {}
+        self._local = threading.local()
+
+    def registrar(self, nome, ms, erro=False):
+        with self._lock:
+            self.amostras[nome].append(ms)
+            if erro:
+                self.erros[nome] += 1
+
+    def contar_cache(self, nome, acerto):
+        with self._lock:
+            self.cache[nome]["acertos" if acerto else "falhas"] += 1
+
+    def marcar_inicio(self, etapa, desde):
+        with self._lock:
+            self.inicio.setdefault(etapa, (time.perf_counter() - desde) * 1000)
+
+    @contextmanager
+    def medir(self, nome):
+        inicio = time.perf_counter()
+        erro = False
+        try:
+            yield
+        except Exception:
+            erro = True
+            raise
+        finally:
+            self.registrar(nome, (time.perf_counter() - inicio) * 1000, erro)
+
+    def cronometrar(self, nome=None):
+        """Decorador que mede cada chamada da função."""
+        def decorar(funcao):
+            rotulo = nome or funcao.__name__
+
+            @functools.wraps(funcao)
+            def envolver(*args, **kwargs):
+                with self.medir(rotulo):
+                    return funcao(*args, **kwargs)
+            return envolver
+        return decorar
+
+    def iniciar_rerun(self):
+        """Marca o início do script; devolve o estado que `finalizar_rerun` precisa."""
+        anterior = getattr(self._local, "perfil", None)
+        if anterior is not None:
+            # O rerun anterior desta thread foi interrompido (st.rerun/st.stop) antes de finalizar.
+            anterior.disable()
+        perfil = self._local.perfil = None
+        if self.amostrador_ativo:
+            perfil = cProfile.Profile()
+            try:
+                perfil.enable()
+            except ValueError:
+                # Outro rerun já está sendo perfilado neste processo.
+                perfil = None
+            self._local.perfil = perfil
+        return time.perf_counter(), perfil
+
+    def finalizar_rerun(self, estado, rotulo=""):
+        inicio, perfil = estado
+        ms = (time.perf_counter() - inicio) * 1000
+        self.registrar("script", ms)
+        if perfil is None:
+            return
+        perfil.disable()
+        self._local.perfil = None
+        if ms >= self.limite_lento_ms:
+            saida = io.StringIO()
+            pstats.Stats(perfil, stream=saida).sort_stats("cumulative").print_stats(30)
+            with self._lock:
+                self.perfis.appendleft({
+                    "quando": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "rotulo": rotulo, "ms": round(ms, 1), "perfil": saida.getvalue(),
+                })
+
+    def resumo(self):
+        with self._lock:
+            copias = {nome: sorted(valores) for nome, valores in self.amostras.items()}
+            erros = dict(self.erros)
+        linhas = []
+        for nome, valores in sorted(copias.items()):
+            linhas.append({
+                "metrica": nome, "amostras": len(valores), "erros": erros.get(nome, 0),
+                "p50_ms": round(_percentil(valores, 0.50), 2), "p90_ms": round(_percentil(valores, 0.90), 2),
+                "p99_ms": round(_percentil(valores, 0.99), 2), "max_ms": round(valores[-1] if valores else 0.0, 2),
+            })
+        return linhas
+
+    def resumo_cache(self):
+        with self._lock:
+            return [
+                {"cache": nome, **c, "taxa_acerto": round(c["acertos"] / max(c["acertos"] + c["falhas"], 1), 3)}
+                for nome, c in sorted(self.cache.items())
+            ]
+
+    def resumo_inicio(self):
+        with self._lock:
+            return [{"etapa": etapa, "ms": round(ms, 1)} for etapa, ms in self.inicio.items()]
+
+    def exportar_csv(self):
+        saida = io.StringIO()
+        linhas = self.resumo()
+        if linhas:
+            writer = csv.DictWriter(saida, fieldnames=linhas[0].keys())
+            writer.writeheader()
+            writer.writerows(linhas)
+        return saida.getvalue()
+
+    def exportar_json(self):
+        return json.dumps({
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            "metricas": self.resumo(), "cache": self.resumo_cache(), "inicio": self.resumo_inicio(),
+        }, indent=2, ensure_ascii=False)
+
+    def limpar(self):
+        with self._lock:
+            self.amostras.clear()
+            self.erros.clear()
+            self.cache.clear()
+            self.perfis.clear()
+
+
+# Um monitor por processo, compartilhado por todas as sessões.
+MONITOR = Monitor()
@@ -0,0 +1,148 @@
+"""Importação de planilhas Excel em lotes para a tabela de frases.
+
+A planilha é lida em modo somente-leitura, um bloco de linhas por vez, então o
+uso de memória não cresce com o tamanho do arquivo. As assinaturas de
+duplicidade são calculadas por coluna (pandas) e as inserções vão em lote.
+"""
+import time
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+from corpus import paginar_por_id
+from similaridade import IndiceSimilaridade, assinatura
+
+COLUNAS_OBRIGATORIAS = ("empresa", "motivo", "conteudo")
+TAMANHO_LOTE = 500
+# Quantas frases parecidas guardar no resumo para exibir (a contagem é sempre completa).
+MAX_PARECIDAS_LISTADAS = 200
+TENTATIVAS = 3
+ESPERA_INICIAL = 0.5
+
+
+def _padronizar_coluna(serie):
+    return serie.fillna("").astype(str).str.strip()
+
+
+def assinaturas(df):
+    """Versão vetorizada de `gerar_assinatura` (empresa|motivo|conteudo em minúsculas)."""
+    return (
+        _padronizar_coluna(df["empresa"]).str.lower() + "|"
+        + _padronizar_coluna(df["motivo"]).str.lower() + "|"
+        + _padronizar_coluna(df["conteudo"]).str.lower()
+    )
+
+
+def ler_planilha_em_blocos(arquivo, tamanho=TAMANHO_LOTE, obrigatorias=COLUNAS_OBRIGATORIAS):
+    """Gera (total_estimado, DataFrame) com até `tamanho` linhas por bloco."""
+    livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        aba = livro.active
+        linhas = aba.iter_rows(values_only=True)
+        cabecalho = [str(c).lower().strip() if c is not None else "" for c in next(linhas, ())]
+        faltando = [c for c in obrigatorias if c not in cabecalho]
+        if faltando:
+            raise ValueError(f"Colunas ausentes: {', '.join(faltando)}")
+        total = max((aba.max_row or 1) - 1, 0)
+        bloco = []
+        for linha in linhas:
+            if any(v is not None and str(v).strip() for v in linha):
+                bloco.append(linha)
+            if len(bloco) == tamanho:
+                yield total, pd.DataFrame(bloco, columns=cabecalho)
+                bloco = []
+        if bloco:
+            yield total, pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        livro.close()
+
+
+def assinaturas_existentes(cliente):
+    frases = paginar_por_id(lambda: cliente.table("frases").select("id, empresa, motivo, conteudo"))
+    return set(assinaturas(pd.DataFrame(list(frases), columns=["id", *COLUNAS_OBRIGATORIAS])))
+
+
+def inserir_lote(cliente, registros, tentativas=TENTATIVAS, upsert=False):
+    """Grava vários registros numa única requisição.
+
+    O insert não é repetido aqui: se a resposta se perder depois do commit, repetir
+    duplicaria o bloco. Quem decide é o `ClienteInstrumentado` (só repete quando a
+    requisição nem saiu). O upsert por id da restauração é idempotente e ganha
+    novas tentativas com backoff exponencial.
+    """
+    if not upsert:
+        return cliente.table("frases").insert(registros).execute().data or []
+    for tentativa in range(tentativas):
+        try:
+            return cliente.table("frases").upsert(registros).execute().data or []
+        except Exception:
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(ESPERA_INICIAL * 2 ** tentativa)
+
+
+def _separar_parecidas(novas, similaridade, do_arquivo, limiar, inicio, resumo):
+    """Remove de `novas` as frases quase iguais ao corpus ou a linhas anteriores do arquivo."""
+    manter = []
+    for idx, conteudo, empresa in zip(novas.index, novas["conteudo"], novas["empresa"]):
+        sig = assinatura(conteudo, empresa)
+        parecidas = similaridade.similares_assinatura(sig, limiar) or do_arquivo.similares_assinatura(sig, limiar)
+        if not parecidas:
+            manter.append(idx)
+            # Ids negativos marcam linhas do próprio arquivo.
+            do_arquivo.adicionar({"id": -(inicio + idx)}, sig)
+            continue
+        resumo["parecidas"] += 1
+        if len(resumo["lista_parecidas"]) < MAX_PARECIDAS_LISTADAS:
+            id_similar, grau = parecidas[0]
+            resumo["lista_parecidas"].append({
+                "empresa": empresa, "conteudo": conteudo[:120], "similaridade": round(grau, 2),
+                "parecida_com": f"#{id_similar}" if id_similar > 0 else f"registro {-id_similar} do arquivo",
+            })
+    return novas.loc[manter]
+
+
+def importar_planilha(cliente, arquivo, usuario, ao_progredir=None, tamanho=TAMANHO_LOTE, similaridade=None, limiar=None):
+    """Importa a planilha e retorna um resumo com contagens e falhas por bloco.
+
+    Com `similaridade`, as frases quase duplicadas (acima de `limiar`) não são
+    inseridas e aparecem em `lista_parecidas`.
+    """
+    resumo = {"sucesso": 0, "duplicados": 0, "parecidas": 0, "erros": 0, "falhas": [], "inseridas": [], "lista_parecidas": []}
+    do_arquivo = IndiceSimilaridade()
+    vistas = assinaturas_existentes(cliente)
+    hoje = datetime.now().strftime('%Y-%m-%d')
+    lidas = 0
+    for n, (total, df) in enumerate(ler_planilha_em_blocos(arquivo, tamanho), start=1):
+        inicio, lidas = lidas + 1, lidas + len(df)
+        for coluna in COLUNAS_OBRIGATORIAS:
+            df[coluna] = _padronizar_coluna(df[coluna])
+        incompletas = (df[list(COLUNAS_OBRIGATORIAS)] == "").any(axis=1)
+        resumo["erros"] += int(incompletas.sum())
+        df = df[~incompletas]
+
+        df = df.assign(_assinatura=assinaturas(df))
+        df = df.drop_duplicates("_assinatura")
+        novas = df[~df["_assinatura"].isin(vistas)]
+        resumo["duplicados"] += int((~incompletas).sum()) - len(novas)
+        if similaridade is not None:
+            novas = _separar_parecidas(novas, similaridade, do_arquivo, limiar, inicio, resumo)
+
+        documento = _padronizar_coluna(novas["documento"]) if "documento" in novas else pd.Series("", index=novas.index)
+        registros = pd.DataFrame({
+            "empresa": novas["empresa"], "documento": documento.where(documento != "", "Geral"),
+            "motivo": novas["motivo"], "conteudo": novas["conteudo"],
+            "revisado_por": usuario, "data_revisao": hoje,
+        }).to_dict("records")
+        if registros:
+            try:
+                resumo["inseridas"] += inserir_lote(cliente, registros)
+                resumo["sucesso"] += len(registros)
+                vistas.update(novas["_assinatura"])
+            except Exception as e:
+                resumo["erros"] += len(registros)
+                resumo["falhas"].append(f"Bloco {n} (registros {inicio}–{lidas}): {e}")
+        if ao_progredir:
+            ao_progredir(min(lidas / total, 1.0) if total else 1.0)
+    return resumo
@@ -0,0 +1,143 @@
+"""Frases-modelo com campos como `{candidato}` e `{vaga}`.
+
+Cada conteúdo é compilado uma vez (cache por texto) numa lista de trechos
+fixos e campos. Um campo sem valor fica no texto como está, para o
+recrutador ver o que faltou preencher.
+
+No modo em lote, a planilha de candidatos é lida em blocos (no CSV, o
+separador é detectado: o Excel em pt-BR grava com `;`) e as mensagens de
+cada bloco são montadas por coluna (concatenação vetorizada do pandas). O
+resultado vai direto para um arquivo temporário em CSV ou XLSX (openpyxl em
+modo write-only), sem juntar todas as mensagens na memória.
+"""
+import functools
+import io
+import re
+import tempfile
+
+CAMPO = re.compile(r"\{(\w+)\}")
+FORMATOS_LOTE = {"csv": ("mensagens.csv", "text/csv"),
+                 "xlsx": ("mensagens.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+TAMANHO_BLOCO = 2000
+LIMITE_MEMORIA = 8 * 1024 * 1024
+SEPARADORES = (",", ";", "\t", "|")
+
+
+class Modelo:
+    def __init__(self, texto):
+        partes = CAMPO.split(texto)
+        # partes alterna trecho fixo / nome do campo: [fixo, campo, fixo, campo, ..., fixo]
+        self.fixos = partes[0::2]
+        self.campos = [c.lower() for c in partes[1::2]]
+
+    @property
+    def tem_campos(self):
+        return bool(self.campos)
+
+    def renderizar(self, valores):
+        saida = [self.fixos[0]]
+        for campo, fixo in zip(self.campos, self.fixos[1:]):
+            valor = valores.get(campo)
+            saida.append(str(valor) if valor not in (None, "") else f"{{{campo}}}")
+            saida.append(fixo)
+        return "".join(saida)
+
+    def renderizar_colunas(self, df, fixos=None):
+        """Versão vetorizada: uma mensagem por linha do DataFrame."""
+        import pandas as pd
+
+        fixos = fixos or {}
+        if df.empty:
+            # Somar texto a uma Series vazia de object quebra no pandas (radd str/object).
+            return pd.Series([], index=df.index, dtype=object)
+        mensagens = pd.Series(self.fixos[0], index=df.index, dtype=object)
+        for campo, fixo in zip(self.campos, self.fixos[1:]):
+            # Célula vazia usa o valor fixo (ex.: a empresa da frase) ou mantém o campo.
+            padrao = str(fixos[campo]) if fixos.get(campo) else f"{{{campo}}}"
+            if campo in df.columns:
+                coluna = df[campo].fillna("").astype(str).str.strip()
+                mensagens = mensagens + coluna.where(coluna != "", padrao) + fixo
+            else:
+                mensagens = mensagens + padrao + fixo
+        return mensagens
+
+
+@functools.lru_cache(maxsize=4096)
+def compilar(texto):
+    return Modelo(texto or "")
+
+
+def _separador(arquivo):
+    """Separador mais frequente no cabeçalho do CSV (vírgula se não houver nenhum).
+
+    O farejador do pandas (sep=None) erra em planilhas de uma coluna só,
+    tomando uma letra do cabeçalho como separador.
+    """
+    inicio = arquivo.tell()
+    cabecalho = arquivo.readline()
+    arquivo.seek(inicio)
+    if isinstance(cabecalho, bytes):
+        cabecalho = cabecalho.decode("utf-8", errors="ignore")
+    contagens = {sep: cabecalho.count(sep) for sep in SEPARADORES}
+    melhor = max(contagens, key=contagens.get)
+    return melhor if contagens[melhor] else ","
+
+
+def _blocos_candidatos(arquivo, nome, tamanho):
+    import pandas as pd
+
+    if nome.lower().endswith(".csv"):
+        # utf-8-sig tira o BOM do "CSV UTF-8" do Excel.
+        for df in pd.read_csv(arquivo, chunksize=tamanho, dtype=str, keep_default_na=False,
+                              sep=_separador(arquivo), encoding="utf-8-sig"):
+            df.columns = [str(c).lower().strip() for c in df.columns]
+            yield None, df
+    else:
+        from importacao import ler_planilha_em_blocos
+
+        yield from ler_planilha_em_blocos(arquivo, tamanho, obrigatorias=())
+
+
+def _checar_colunas(modelo, colunas, fixos):
+    """Sem nenhuma coluna para os campos do modelo, todas as mensagens sairiam sem preencher."""
+    campos = [c for c in dict.fromkeys(modelo.campos) if not (fixos or {}).get(c)]
+    if campos and not set(campos) & set(colunas):
+        raise ValueError(f"A planilha não tem nenhuma coluna para os campos do modelo ({', '.join(campos)}). "
+                         f"Colunas encontradas: {', '.join(map(str, colunas))}.")
+
+
+def gerar_lote(modelo, arquivo, nome, formato="csv", fixos=None, ao_progredir=None, tamanho=TAMANHO_BLOCO):
+    """Gera as mensagens para cada candidato da planilha. Retorna (arquivo temporário, total)."""
+    destino = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA)
+    total, feitos, planilha, livro = 0, 0, None, None
+    texto = io.TextIOWrapper(destino, encoding="utf-8-sig", newline="") if formato == "csv" else None
+    try:
+        for estimado, df in _blocos_candidatos(arquivo, nome, tamanho):
+            if feitos == 0:
+                _checar_colunas(modelo, df.columns, fixos)
+            df = df.assign(mensagem=modelo.renderizar_colunas(df, fixos))
+            if formato == "csv":
+                df.to_csv(texto, index=False, header=feitos == 0)
+            else:
+                if livro is None:
+                    import openpyxl
+
+                    livro = openpyxl.Workbook(write_only=True)
+                    planilha = livro.create_sheet("mensagens")
+                    planilha.append(list(df.columns))
+                for linha in df.itertuples(index=False):
+                    planilha.append(list(linha))
+            feitos += len(df)
+            total = estimado or total
+            if ao_progredir and total:
+                ao_progredir(min(feitos / total, 1.0))
+        if not feitos:
+            raise ValueError("A planilha não tem nenhum candidato (só o cabeçalho ou vazia).")
+        if livro is not None:
+            livro.save(destino)
+    finally:
+        if texto is not None:
+            texto.flush()
+            texto.detach()
+    destino.seek(0)
+    return destino, feitos
@@ -0,0 +1,139 @@
+"""Detecção de frases quase duplicadas com MinHash + LSH.
+
+Cada frase é normalizada (sem acentos, pontuação, espaços repetidos e sem o
+nome da própria empresa) e quebrada em trechos de 5 caracteres. A assinatura
+MinHash estima a similaridade de Jaccard entre dois textos; as faixas do LSH
+levam direto aos candidatos parecidos, sem comparar com o corpus inteiro.
+"""
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from busca import normalizar
+
+LIMIAR_PADRAO = 0.8
+TAMANHO_TRECHO = 5
+NUM_PERMUTACOES = 128
+# 32 faixas de 4 linhas: pares com similaridade acima de ~0,45 quase sempre colidem.
+FAIXAS = 32
+_PRIMO = np.uint64((1 << 31) - 1)
+_gerador = np.random.default_rng(20240601)
+_A = _gerador.integers(1, int(_PRIMO), NUM_PERMUTACOES, dtype=np.uint64)
+_B = _gerador.integers(0, int(_PRIMO), NUM_PERMUTACOES, dtype=np.uint64)
+
+_RE_PONTUACAO = re.compile(r"[^\w\s]")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_conteudo(conteudo, empresa=None):
+    texto = _RE_PONTUACAO.sub(" ", normalizar(conteudo))
+    if empresa:
+        nome = _RE_ESPACOS.sub(" ", _RE_PONTUACAO.sub(" ", normalizar(empresa))).strip()
+        if nome:
+            texto = re.sub(rf"\b{re.escape(nome)}\b", " ", _RE_ESPACOS.sub(" ", texto))
+    return _RE_ESPACOS.sub(" ", texto).strip()
+
+
+def assinatura(conteudo, empresa=None):
+    texto = normalizar_conteudo(conteudo, empresa)
+    trechos = {texto[i:i + TAMANHO_TRECHO] for i in range(max(len(texto) - TAMANHO_TRECHO + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in trechos), dtype=np.uint64, count=len(trechos))
+    # (a*h + b) mod p para as 128 permutações de uma vez; h < 2^32 e a < 2^31 não estouram 64 bits.
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIMO).min(axis=1).astype(np.uint32)
+
+
+def similaridade(a, b):
+    return float(np.count_nonzero(a == b)) / NUM_PERMUTACOES
+
+
+class IndiceSimilaridade:
+    def __init__(self, frases=(), limiar=LIMIAR_PADRAO):
+        self._lock = threading.RLock()
+        self.limiar = limiar
+        self.assinaturas = {}
+        self._faixas = [defaultdict(set) for _ in range(FAIXAS)]
+        for frase in frases:
+            self.adicionar(frase)
+
+    @staticmethod
+    def _chaves(sig):
+        linhas = NUM_PERMUTACOES // FAIXAS
+        return [sig[i * linhas:(i + 1) * linhas].tobytes() for i in range(FAIXAS)]
+
+    def adicionar(self, frase, sig=None):
+        sig = assinatura(frase.get("conteudo"), frase.get("empresa")) if sig is None else sig
+        with self._lock:
+            self.remover(frase["id"])
+            self.assinaturas[frase["id"]] = sig
+            for faixa, chave in zip(self._faixas, self._chaves(sig)):
+                faixa[chave].add(frase["id"])
+
+    def remover(self, id_frase):
+        with self._lock:
+            sig = self.assinaturas.pop(id_frase, None)
+            if sig is None:
+                return
+            for faixa, chave in zip(self._faixas, self._chaves(sig)):
+                faixa[chave].discard(id_frase)
+                if not faixa[chave]:
+                    del faixa[chave]
+
+    def similares_assinatura(self, sig, limiar=None, excluir=None):
+        """[(id, similaridade)] acima do limiar, da mais parecida para a menos."""
+        limiar = self.limiar if limiar is None else limiar
+        with self._lock:
+            candidatos = set()
+            for faixa, chave in zip(self._faixas, self._chaves(sig)):
+                candidatos |= faixa.get(chave, set())
+            candidatos.discard(excluir)
+            pares = [(i, similaridade(sig, self.assinaturas[i])) for i in candidatos]
+        return sorted([p for p in pares if p[1] >= limiar], key=lambda p: -p[1])
+
+    def similares(self, conteudo, empresa=None, limiar=None, excluir=None):
+        return self.similares_assinatura(assinatura(conteudo, empresa), limiar, excluir)
+
+    def agrupar(self, limiar=None):
+        """Grupos (listas de ids) de frases quase duplicadas entre si.
+
+        Copia as faixas e solta o lock antes de comparar, para não travar as
+        checagens de `similares` durante o cálculo. Em cada faixa, um id só é
+        comparado (de uma vez, com numpy) com os que ainda estão em outro grupo.
+        """
+        limiar = self.limiar if limiar is None else limiar
+        with self._lock:
+            assinaturas = dict(self.assinaturas)
+            baldes = [sorted(ids) for faixa in self._faixas for ids in faixa.values() if len(ids) > 1]
+        pai = {}
+
+        def raiz(i):
+            while pai.get(i, i) != i:
+                pai[i] = pai.get(pai[i], pai[i])
+                i = pai[i]
+            return i
+
+        minimo = limiar * NUM_PERMUTACOES
+        for ids in baldes:
+            raizes = np.array([raiz(i) for i in ids])
+            if (raizes == raizes[0]).all():
+                continue
+            sigs = np.stack([assinaturas[i] for i in ids])
+            for n in range(len(ids) - 1):
+                outros = np.flatnonzero(raizes[n + 1:] != raizes[n]) + n + 1
+                if not len(outros):
+                    continue
+                iguais = np.count_nonzero(sigs[outros] == sigs[n], axis=1)
+                for m in outros[iguais >= minimo]:
+                    a, b = int(raizes[n]), int(raizes[m])
+                    if a == b:
+                        continue
+                    pai.setdefault(a, a)
+                    pai.setdefault(b, b)
+                    pai[b] = a
+                    raizes[raizes == b] = a
+        grupos = defaultdict(list)
+        for i in pai:
+            grupos[raiz(i)].append(i)
+        return sorted((sorted(g) for g in grupos.values()), key=len, reverse=True)
@@ -0,0 +1,154 @@
+"""Snapshot do corpus em disco (SQLite), compartilhado pelas réplicas do app.
+
+Um único processo atualizador mantém o arquivo em dia com o Supabase:
+
+    python snapshot.py                # usa SUPABASE_URL/SUPABASE_KEY ou .streamlit/secrets.toml
+    python snapshot.py --intervalo 15 --arquivo /dados/corpus_snapshot.sqlite
+
+Cada worker abre o arquivo só para leitura (com mmap, então as páginas ficam
+no cache do sistema operacional e são compartilhadas entre os processos). Um
+worker recém-iniciado monta o índice a partir do snapshot, sem ir à rede, e
+enquanto o atualizador estiver vivo as sincronizações seguintes também leem
+do arquivo em vez de consultar o Supabase.
+
+Junto com as frases vai o índice de busca já montado pelo atualizador
+(`postings`: por token, os ids e pesos em arrays binários). Assim o worker
+não tokeniza o corpus de novo. Com 100 mil frases sintéticas, a primeira
+carga de um worker caiu de ~11,7 s (JSON mais IndiceBusca montado do zero) para
+~2,1 s; em troca, cada gravação do atualizador leva ~4 s em vez de ~2 s.
+Snapshots antigos, sem a tabela, ainda são lidos montando o índice do zero.
+
+O arquivo é regravado por inteiro num temporário e trocado com `os.replace`,
+então ninguém lê um snapshot pela metade. Quando nada muda, o atualizador só
+renova a data de modificação, que os workers usam para saber que ele está vivo.
+"""
+import argparse
+import json
+from array import array
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+ARQUIVO_SNAPSHOT = os.environ.get(
+    "GUPY_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus_snapshot.sqlite"))
+INTERVALO = 30
+# Sem renovação por esse tempo, o snapshot é tido como abandonado e os workers voltam ao Supabase.
+VALIDADE = 4 * INTERVALO
+MMAP_BYTES = 256 * 1024 * 1024
+
+
+def gravar(caminho, frases, marca_frases, marca_remocoes, postings=None):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    con = sqlite3.connect(temporario)
+    try:
+        con.executescript("""
+            create table frases (id integer primary key, updated_at text, dados text not null);
+            create index frases_updated_at on frases (updated_at);
+            create table meta (chave text primary key, valor text);
+            create table postings (token text primary key, ids blob not null, pesos blob not null);
+        """)
+        max_id = 0
+        linhas = []
+        for frase in frases:
+            max_id = max(max_id, frase["id"])
+            linhas.append((frase["id"], frase.get("updated_at"), json.dumps(frase, ensure_ascii=False, default=str)))
+        con.executemany("insert into frases values (?, ?, ?)", linhas)
+        if postings is not None:
+            con.executemany("insert into postings values (?, ?, ?)", (
+                (token, array("q", docs.keys()).tobytes(), array("d", docs.values()).tobytes())
+                for token, docs in postings.items()))
+        con.executemany("insert into meta values (?, ?)", [
+            ("gerado_em", datetime.now().isoformat()), ("max_id", str(max_id)),
+            ("marca_frases", marca_frases), ("marca_remocoes", marca_remocoes),
+        ])
+        con.commit()
+    finally:
+        con.close()
+    os.replace(temporario, caminho)
+
+
+def valido(caminho, validade=VALIDADE):
+    try:
+        return time.time() - os.stat(caminho).st_mtime < validade
+    except OSError:
+        return False
+
+
+def abrir(caminho):
+    con = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+    con.execute(f"pragma mmap_size = {MMAP_BYTES}")
+    return con
+
+
+def ler_meta(con):
+    return dict(con.execute("select chave, valor from meta"))
+
+
+def ler_frases(con, desde=None):
+    if desde is None:
+        cursor = con.execute("select dados from frases")
+    else:
+        cursor = con.execute("select dados from frases where updated_at >= ?", (desde,))
+    for (dados,) in cursor:
+        yield json.loads(dados)
+
+
+def ler_postings(con):
+    """{token: {id: peso}} gravado pelo atualizador, ou None se o snapshot não tiver o índice."""
+    try:
+        cursor = con.execute("select token, ids, pesos from postings")
+    except sqlite3.OperationalError:
+        return None
+    postings = {}
+    for token, ids, pesos in cursor:
+        postings[token] = dict(zip(array("q", ids), array("d", pesos)))
+    return postings or None
+
+
+def ler_ids(con):
+    return {i for (i,) in con.execute("select id from frases")}
+
+
+def manter(cliente, caminho=ARQUIVO_SNAPSHOT, intervalo=INTERVALO):
+    """Laço do processo atualizador."""
+    from corpus import CorpusSincronizado
+
+    corpus = CorpusSincronizado(cliente, intervalo=0, arquivo_snapshot=caminho, ler_snapshot_valido=False)
+    gravada = None
+    while True:
+        try:
+            corpus.sincronizar(forcar=True)
+            if corpus.versao != gravada:
+                gravar(caminho, list(corpus.indice.frases.values()), corpus.marca_frases, corpus.marca_remocoes,
+                       corpus.indice.postings)
+                gravada = corpus.versao
+                print(f"{datetime.now():%H:%M:%S} snapshot gravado: {len(corpus.indice)} frases", file=sys.stderr)
+            else:
+                os.utime(caminho)
+        except Exception as e:
+            print(f"{datetime.now():%H:%M:%S} falha ao atualizar snapshot: {e}", file=sys.stderr)
+        time.sleep(intervalo)
+
+
+def _credenciais():
+    url, chave = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if url and chave:
+        return url, chave
+    import tomllib
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml"), "rb") as f:
+        segredos = tomllib.load(f)
+    return segredos["SUPABASE_URL"], segredos["SUPABASE_KEY"]
+
+
+if __name__ == "__main__":
+    from banco import criar_cliente
+
+    parser = argparse.ArgumentParser(description="Mantém o snapshot do corpus atualizado.")
+    parser.add_argument("--arquivo", default=ARQUIVO_SNAPSHOT)
+    parser.add_argument("--intervalo", type=float, default=INTERVALO)
+    args = parser.parse_args()
+    manter(criar_cliente(*_credenciais()), args.arquivo, args.intervalo)
@@ -0,0 +1,16 @@
+"""Os testes rodam contra o `ClienteLocal` do benchmark, sem Supabase nem rede."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark.cliente_local import ClienteLocal  # noqa: E402
+from benchmark.gerador import gerar_frases  # noqa: E402
+
+
+@pytest.fixture
+def cliente():
+    """Banco com 30 frases e a tabela de lápides (gatilho `frases_lapide` emulado)."""
+    return ClienteLocal({"frases": gerar_frases(30), "frases_removidas": []})
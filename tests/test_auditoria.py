@@ -0,0 +1,130 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from auditoria import RegistroAuditoria
+from benchmark.cliente_local import ClienteLocal
+
+
+class Recusa(Exception):
+    """Erro do PostgREST para uma linha que viola uma restrição (4xx)."""
+    code = "23502"
+
+
+class ClienteLogs(ClienteLocal):
+    """Recusa eventos sem `acao` (como um `not null`) e pode simular queda da rede."""
+
+    def __init__(self):
+        super().__init__({"logs": []})
+        self.fora = False
+
+    def table(self, nome):
+        consulta = super().table(nome)
+        executar = consulta.execute
+
+        def execute():
+            if self.fora:
+                raise ConnectionError("sem rede")
+            if consulta._operacao[0] == "insert" and any("acao" not in e for e in consulta._operacao[1]):
+                raise Recusa()
+            return executar()
+        consulta.execute = execute
+        return consulta
+
+
+def eventos(*nums):
+    return [{"acao": "teste", "n": n} for n in nums]
+
+
+def enviados(cliente):
+    return sorted(e["n"] for e in cliente.tabelas["logs"])
+
+
+def ler(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+@pytest.fixture
+def registro(tmp_path):
+    registro = RegistroAuditoria(ClienteLogs(), arquivo=str(tmp_path / "pendentes.jsonl"), tamanho_lote=4,
+                                 intervalo=0.05, arquivo_rejeitados=str(tmp_path / "rejeitados.jsonl"))
+    yield registro
+    registro.descarregar(espera=1)
+
+
+def test_evento_recusado_vai_para_rejeitados_sem_travar_os_outros(registro):
+    ruim = {"n": 99}
+    registro._enviar(eventos(0, 1, 2) + [ruim] + eventos(4, 5, 6))
+    assert enviados(registro.cliente) == [0, 1, 2, 4, 5, 6]
+    assert ler(registro.arquivo_rejeitados) == [ruim]
+    assert registro.rejeitados == 1
+    assert not os.path.exists(registro.arquivo)
+
+
+def test_queda_guarda_no_disco_e_reenvia_depois(registro):
+    registro.cliente.fora = True
+    registro._enviar(eventos(0, 1))
+    assert registro.pendentes_em_disco == 2
+    assert [e["n"] for e in ler(registro.arquivo)] == [0, 1]
+
+    registro.cliente.fora = False
+    registro._enviar(eventos(2))
+    assert enviados(registro.cliente) == [0, 1, 2]
+    assert registro.pendentes_em_disco == 0
+    assert not os.path.exists(registro.arquivo)
+
+
+def test_arquivo_de_pendentes_e_por_processo(registro, tmp_path):
+    assert os.path.dirname(registro.arquivo) == str(tmp_path)
+    assert registro.arquivo.endswith(f".{os.getpid()}.jsonl")
+
+
+def test_adota_pendentes_de_processo_morto(registro):
+    morto = subprocess.Popen([sys.executable, "-c", "pass"])
+    morto.wait()
+    orfao = f"{registro._prefixo}{morto.pid}{registro._extensao}"
+    with open(orfao, "w", encoding="utf-8") as f:
+        f.write(json.dumps(eventos(7)[0]) + "\n")
+    with open(registro._base, "w", encoding="utf-8") as f:
+        f.write(json.dumps(eventos(8)[0]) + "\n")
+
+    registro._enviar(eventos(9))
+    assert enviados(registro.cliente) == [7, 8, 9]
+    assert not os.path.exists(orfao) and not os.path.exists(registro._base)
+
+
+def test_descarregar_entrega_o_lote_que_a_thread_ja_pegou(tmp_path):
+    cliente = ClienteLogs()
+    # Prazo longo: a thread fica com os eventos na mão esperando o lote encher.
+    registro = RegistroAuditoria(cliente, arquivo=str(tmp_path / "p.jsonl"), tamanho_lote=50, intervalo=60)
+    for n in range(7):
+        registro.registrar(eventos(n)[0])
+    registro.descarregar(espera=5)
+    assert enviados(cliente) == list(range(7))
+    assert not registro._thread.is_alive()
+
+
+def test_descarregar_com_envio_travado_guarda_no_disco(tmp_path):
+    liberar = threading.Event()
+    cliente = ClienteLogs()
+    tabela = cliente.table
+
+    def table_lenta(nome):
+        liberar.wait()
+        return tabela(nome)
+    cliente.table = table_lenta
+    registro = RegistroAuditoria(cliente, arquivo=str(tmp_path / "p.jsonl"), intervalo=0.01)
+    registro.registrar(eventos(0)[0])
+    while registro.fila.qsize():
+        pass
+    registro.registrar(eventos(1)[0])
+    registro.descarregar(espera=0.2)
+    try:
+        assert sorted(e["n"] for e in ler(registro.arquivo)) == [0, 1]
+    finally:
+        liberar.set()
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+import autenticacao
+from autenticacao import Autenticador, assinar_token, gerar_hash, precisa_regravar, validar_token, verificar_senha
+from benchmark.cliente_local import ClienteLocal
+
+ITERACOES = 1000
+CHAVE = b"segredo-de-teste"
+
+
+@pytest.fixture
+def autenticador():
+    cliente = ClienteLocal({"usuarios": [
+        {"id": 1, "username": "ana", "senha": gerar_hash("certa", ITERACOES), "admin": True},
+        {"id": 2, "username": "legado", "senha": "antiga", "admin": False},
+        {"id": 3, "username": "sem_senha", "senha": None, "admin": False},
+    ]})
+    return Autenticador(cliente, CHAVE, iteracoes=ITERACOES)
+
+
+def test_hash_confere_so_a_senha_certa():
+    armazenada = gerar_hash("certa", ITERACOES)
+    assert armazenada.startswith(f"pbkdf2_sha256${ITERACOES}$")
+    assert verificar_senha("certa", armazenada)
+    assert not verificar_senha("errada", armazenada)
+    assert gerar_hash("certa", ITERACOES) != armazenada
+
+
+@pytest.mark.parametrize("senha, armazenada", [("", None), ("", ""), ("x", None), ("", "texto")])
+def test_senha_vazia_nunca_autentica(senha, armazenada):
+    assert not verificar_senha(senha, armazenada)
+
+
+def test_login(autenticador):
+    usuario = autenticador.login("ana", "certa")
+    assert usuario == {"id": 1, "username": "ana", "admin": True}
+    assert autenticador.login("ana", "errada") is None
+    assert autenticador.login("ninguem", "certa") is None
+    assert autenticador.login("sem_senha", "") is None
+
+
+def test_senha_legada_e_regravada_no_login(autenticador):
+    assert autenticador.login("legado", "antiga")
+    armazenada = autenticador.cliente.tabelas["usuarios"][1]["senha"]
+    assert not precisa_regravar(armazenada, ITERACOES)
+    assert autenticador.login("legado", "antiga")
+
+
+def test_token_volta_o_usuario():
+    assert validar_token(CHAVE, assinar_token(CHAVE, "ana")) == "ana"
+
+
+def test_token_adulterado_ou_vencido_nao_vale():
+    token = assinar_token(CHAVE, "ana")
+    usuario, expira, assinatura = token.split(".")
+    outro = assinar_token(CHAVE, "bia").split(".")[0]
+    assert validar_token(CHAVE, f"{outro}.{expira}.{assinatura}") is None
+    assert validar_token(CHAVE, f"{usuario}.{int(expira) + 1}.{assinatura}") is None
+    assert validar_token(b"outra-chave", token) is None
+    assert validar_token(CHAVE, assinar_token(CHAVE, "ana", validade=-1)) is None
+    assert validar_token(CHAVE, "lixo") is None
+
+
+def test_usuario_do_token(autenticador):
+    token = autenticador.emitir_token({"username": "ana"})
+    assert autenticador.usuario_do_token(token)["id"] == 1
+    assert autenticador.usuario_do_token(None) is None
+
+
+def test_chave_vazia_e_recusada():
+    with pytest.raises(ValueError):
+        Autenticador(ClienteLocal(), "")
+
+
+def test_cache_de_usuarios_respeita_ttl_e_invalidacao(autenticador, monkeypatch):
+    assert autenticador.usuario("ana")["admin"]
+    autenticador.cliente.tabelas["usuarios"][0]["admin"] = False
+    assert autenticador.usuario("ana")["admin"]
+    autenticador.usuarios.invalidar("ana")
+    assert not autenticador.usuario("ana")["admin"]
+
+    autenticador.cliente.tabelas["usuarios"][0]["admin"] = True
+    agora = time.monotonic()
+    monkeypatch.setattr(autenticacao.time, "monotonic", lambda: agora + autenticacao.TTL_USUARIOS + 1)
+    assert autenticador.usuario("ana")["admin"]
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from benchmark.gerador import gerar_frases
+from busca import IndiceBusca
+
+
+@pytest.fixture(scope="module")
+def frases():
+    return gerar_frases(300)
+
+
+@pytest.fixture(scope="module")
+def indice(frases):
+    return IndiceBusca(frases)
+
+
+def _percorrer(indice, limite=7, **filtros):
+    vistos, apos = [], None
+    while True:
+        pagina, total, apos = indice.pagina(limite=limite, apos=apos, **filtros)
+        vistos += [f["id"] for f in pagina]
+        if apos is None:
+            return vistos, total
+
+
+@pytest.mark.parametrize("com_popularidade", [False, True])
+def test_paginas_passam_por_cada_id_uma_vez(indice, frases, com_popularidade):
+    sorteio = random.Random(1)
+    popularidade = {f["id"]: sorteio.choice([0.0, 1.0, 2.5]) for f in frases} if com_popularidade else None
+    vistos, total = _percorrer(indice, popularidade=popularidade)
+    assert total == len(frases)
+    assert sorted(vistos) == sorted(f["id"] for f in frases)
+    if popularidade:
+        assert vistos == sorted(vistos, key=lambda i: (-popularidade[i], -i))
+    else:
+        assert vistos == sorted(vistos, reverse=True)
+
+
+def test_paginas_de_busca_seguem_a_relevancia(indice, frases):
+    termo = frases[0]["empresa"].split()[0]
+    vistos, total = _percorrer(indice, termo=termo, limite=5)
+    pontos = indice.buscar(termo)
+    assert total == len(pontos) == len(vistos) == len(set(vistos))
+    assert vistos == sorted(vistos, key=lambda i: (-pontos[i], -i))
+
+
+def test_busca_por_prefixo_e_sem_acento():
+    indice = IndiceBusca([{"id": 1, "conteudo": "Reprovação na entrevista", "empresa": "Acme"},
+                          {"id": 2, "conteudo": "Aprovado", "empresa": "Beta"}])
+    assert set(indice.buscar("reprova")) == {1}
+    assert set(indice.buscar("REPROVACAO entre")) == {1}
+    assert indice.buscar("reprovacao beta") == {}
+    assert indice.buscar("  ") is None
+    assert indice.buscar("reprovacao")[1] > indice.buscar("reprov")[1]
+
+
+def test_contagens_das_facetas(indice, frases):
+    esperado = {}
+    for f in frases:
+        por_doc = esperado.setdefault(f.get("empresa") or "", {})
+        por_doc[f.get("documento") or ""] = por_doc.get(f.get("documento") or "", 0) + 1
+    assert indice.contagens() == esperado
+
+    termo = frases[0]["empresa"].split()[0]
+    ids = indice.buscar(termo)
+    contagem = indice.contagens(ids)
+    assert sum(n for docs in contagem.values() for n in docs.values()) == len(ids)
+    empresa = frases[0]["empresa"]
+    assert len(indice.filtrar(ids, empresa=empresa)) == sum(contagem.get(empresa, {}).values())
+
+
+def test_indice_com_postings_prontos_equivale_ao_montado(frases):
+    montado = IndiceBusca(frases)
+    pronto = IndiceBusca(frases, postings={t: dict(d) for t, d in montado.postings.items()})
+    assert pronto.vocabulario == montado.vocabulario
+    termo = frases[3]["conteudo"].split()[0][:4]
+    assert pronto.pagina(termo, limite=20) == montado.pagina(termo, limite=20)
+
+    for indice in (montado, pronto):
+        indice.remover(frases[0]["id"])
+        indice.adicionar({**frases[1], "conteudo": "texto novo zzzunico"})
+    assert dict(pronto.postings) == dict(montado.postings)
+    assert pronto.vocabulario == montado.vocabulario
+    assert set(pronto.buscar("zzzunico")) == {frases[1]["id"]}
+    assert not any(frases[0]["id"] in docs for docs in pronto.postings.values())
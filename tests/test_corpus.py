@@ -0,0 +1,186 @@
+import time
+
+import backup
+import snapshot
+from benchmark.cliente_local import ClienteLocal
+from benchmark.gerador import gerar_frases
+from corpus import CorpusSincronizado, paginar_por_id, paginar_por_marca
+
+
+def sincronizado(cliente):
+    corpus = CorpusSincronizado(cliente, intervalo=0)
+    corpus.sincronizar()
+    return corpus
+
+
+def ids_banco(cliente):
+    return {f["id"] for f in cliente.tabelas["frases"]}
+
+
+def test_frase_apagada_volta_com_o_backup(cliente):
+    arquivo, manifesto = backup.exportar(cliente, "jsonl")
+    corpus = sincronizado(cliente)
+    cliente.table("frases").delete().eq("id", 5).execute()
+    corpus.sincronizar(forcar=True)
+    assert 5 not in corpus.indice.frases
+
+    backup.restaurar(cliente, arquivo, manifesto["arquivo"], manifesto)
+    for _ in range(3):
+        corpus.sincronizar(forcar=True)
+        assert 5 in corpus.indice.frases
+    assert set(corpus.indice.frases) == ids_banco(cliente)
+
+
+def test_apagar_todas_e_restaurar(cliente):
+    arquivo, manifesto = backup.exportar(cliente, "csv")
+    corpus = sincronizado(cliente)
+    cliente.table("frases").delete().gt("id", 0).execute()
+    corpus.esvaziar()
+    corpus.sincronizar(forcar=True)
+    assert len(corpus.indice) == 0
+
+    backup.restaurar(cliente, arquivo, manifesto["arquivo"], manifesto)
+    corpus.sincronizar(forcar=True)
+    assert len(corpus.indice) == 30
+    corpus.sincronizar(forcar=True)
+    assert set(corpus.indice.frases) == ids_banco(cliente)
+
+
+def test_remocao_depois_da_restauracao_vale(cliente):
+    arquivo, manifesto = backup.exportar(cliente, "jsonl")
+    corpus = sincronizado(cliente)
+    cliente.table("frases").delete().eq("id", 5).execute()
+    backup.restaurar(cliente, arquivo, manifesto["arquivo"], manifesto)
+    corpus.sincronizar(forcar=True)
+    cliente.table("frases").delete().eq("id", 5).execute()
+    corpus.sincronizar(forcar=True)
+    assert 5 not in corpus.indice.frases
+
+
+def test_carga_completa_pagina_alem_do_limite_do_postgrest():
+    cliente = ClienteLocal({"frases": gerar_frases(2500), "frases_removidas": []}, max_linhas=1000)
+    corpus = sincronizado(cliente)
+    assert len(corpus.indice) == 2500
+
+
+def test_delta_traz_insercoes_alteracoes_e_remocoes(cliente):
+    corpus = sincronizado(cliente)
+    versao = corpus.versao
+    cliente.table("frases").insert({"empresa": "Nova", "documento": "Geral", "motivo": "m", "conteudo": "texto novo"}).execute()
+    cliente.table("frases").update({"conteudo": "editado"}).eq("id", 3).execute()
+    cliente.table("frases").delete().eq("id", 4).execute()
+
+    assert corpus.sincronizar(forcar=True)
+    assert corpus.versao == versao + 1
+    assert corpus.indice.frases[3]["conteudo"] == "editado"
+    assert 4 not in corpus.indice.frases
+    assert set(corpus.indice.frases) == ids_banco(cliente)
+    assert not corpus.sincronizar(forcar=True)
+
+
+def test_intervalo_segura_sincronizacoes_seguidas(cliente):
+    corpus = CorpusSincronizado(cliente, intervalo=60)
+    corpus.sincronizar()
+    cliente.table("frases").update({"conteudo": "editado"}).eq("id", 3).execute()
+    assert not corpus.sincronizar()
+    assert corpus.sincronizar(forcar=True)
+
+
+def test_paginar_por_marca_nao_pula_linha_editada_durante_a_leitura():
+    cliente = ClienteLocal({"frases": gerar_frases(2500)}, max_linhas=1000)
+    lidas = []
+
+    def montar():
+        if len(lidas) == 1000:
+            # Depois da primeira página, alguém edita uma linha já lida: ela vai para o fim da ordem.
+            cliente.table("frases").update({"conteudo": "editada"}).eq("id", lidas[0]).execute()
+        return cliente.table("frases").select("id, updated_at")
+
+    for linha in paginar_por_marca(montar, "updated_at"):
+        lidas.append(linha["id"])
+    assert set(lidas) == set(range(1, 2501))
+
+
+def test_paginar_por_id_percorre_tudo_sem_repetir():
+    cliente = ClienteLocal({"frases": gerar_frases(2100)}, max_linhas=1000)
+    ids = [f["id"] for f in paginar_por_id(lambda: cliente.table("frases").select("id"))]
+    assert ids == list(range(1, 2101))
+
+
+def test_snapshot_com_postings_da_o_mesmo_indice(tmp_path, cliente):
+    caminho = str(tmp_path / "snap.sqlite")
+    atualizador = sincronizado(cliente)
+    snapshot.gravar(caminho, list(atualizador.indice.frases.values()), atualizador.marca_frases,
+                    atualizador.marca_remocoes, atualizador.indice.postings)
+
+    # Sem cliente: a carga tem de vir toda do arquivo.
+    worker = CorpusSincronizado(None, arquivo_snapshot=caminho)
+    assert worker.sincronizar()
+    esperado = atualizador.indice
+    for termo in (None, "agradecemos", "entrev", "inexistente"):
+        assert worker.indice.pagina(termo, limite=50)[:2] == esperado.pagina(termo, limite=50)[:2]
+    assert worker.indice.contagens() == esperado.contagens()
+
+    # Tokens de frases vindas dos postings são recalculados na remoção.
+    worker.remover([1])
+    esperado.remover(1)
+    assert dict(worker.indice.postings) == dict(esperado.postings)
+
+
+def test_snapshot_seguinte_aplica_so_a_diferenca(tmp_path, cliente):
+    caminho = str(tmp_path / "snap.sqlite")
+    atualizador = sincronizado(cliente)
+
+    def gravar():
+        snapshot.gravar(caminho, list(atualizador.indice.frases.values()), atualizador.marca_frases,
+                        atualizador.marca_remocoes, atualizador.indice.postings)
+
+    gravar()
+    worker = CorpusSincronizado(None, intervalo=0, arquivo_snapshot=caminho)
+    worker.sincronizar()
+    cliente.table("frases").update({"conteudo": "editado"}).eq("id", 3).execute()
+    cliente.table("frases").delete().eq("id", 4).execute()
+    atualizador.sincronizar(forcar=True)
+    time.sleep(0.01)
+    gravar()
+
+    assert worker.sincronizar(forcar=True)
+    assert worker.indice.frases[3]["conteudo"] == "editado"
+    assert set(worker.indice.frases) == ids_banco(cliente)
+
+
+def test_similaridade_acompanha_gravacoes_e_recargas(cliente):
+    corpus = sincronizado(cliente)
+    similaridade = corpus.similaridade()
+    assert len(similaridade.assinaturas) == 30
+
+    nova = dict(corpus.indice.frases[1], id=99)
+    corpus.aplicar([nova])
+    assert similaridade.similares(nova["conteudo"], nova["empresa"], excluir=99)[0][0] == 1
+
+    corpus.remover([99])
+    corpus._carga_completa()
+    # A recarga completa reaproveita o índice em vez de descartá-lo.
+    assert corpus.similaridade() is similaridade
+    assert set(similaridade.assinaturas) == ids_banco(cliente)
+
+
+def test_similaridade_sem_esperar_monta_em_segundo_plano(cliente):
+    corpus = sincronizado(cliente)
+    assert corpus.similaridade(esperar=False) is None
+    prazo = time.monotonic() + 30
+    while corpus.similaridade(esperar=False) is None and time.monotonic() < prazo:
+        time.sleep(0.05)
+    assert len(corpus.similaridade(esperar=False).assinaturas) == 30
+
+
+def test_agrupar_parecidas_roda_fora_da_requisicao(cliente):
+    corpus = sincronizado(cliente)
+    corpus.aplicar([dict(corpus.indice.frases[1], id=99)])
+    assert corpus.agrupar_parecidas(0.8) is None
+    prazo = time.monotonic() + 30
+    while corpus.agrupando and time.monotonic() < prazo:
+        time.sleep(0.05)
+    resultado = corpus.agrupar_parecidas(0.8)
+    assert [1, 99] in resultado["grupos"]
+    assert resultado["versao"] == corpus.versao
@@ -0,0 +1,45 @@
+import csv
+import io
+
+import pytest
+
+from modelos import compilar, gerar_lote
+
+MODELO = "Olá {candidato}, obrigado pelo interesse na vaga de {vaga} na {empresa}."
+
+
+def _mensagens(planilha, fixos=None):
+    destino, total = gerar_lote(compilar(MODELO), io.BytesIO(planilha.encode("utf-8")), "c.csv", fixos=fixos)
+    linhas = list(csv.DictReader(io.TextIOWrapper(destino, encoding="utf-8-sig", newline="")))
+    assert len(linhas) == total
+    return [linha["mensagem"] for linha in linhas]
+
+
+def test_renderizar_mantem_campo_sem_valor():
+    assert compilar(MODELO).renderizar({"candidato": "Ana", "vaga": ""}) == \
+        "Olá Ana, obrigado pelo interesse na vaga de {vaga} na {empresa}."
+
+
+@pytest.mark.parametrize("sep", [",", ";", "\t"])
+def test_lote_detecta_o_separador(sep):
+    planilha = sep.join(["Candidato", "Vaga"]) + "\n" + sep.join(["Ana", "Dados"]) + "\n" + sep.join(["Bia", ""]) + "\n"
+    assert _mensagens(planilha, fixos={"empresa": "Acme"}) == [
+        "Olá Ana, obrigado pelo interesse na vaga de Dados na Acme.",
+        "Olá Bia, obrigado pelo interesse na vaga de {vaga} na Acme.",
+    ]
+
+
+def test_lote_de_uma_coluna_so():
+    assert _mensagens("candidato\nAna\n", fixos={"empresa": "Acme", "vaga": "Dados"}) == [
+        "Olá Ana, obrigado pelo interesse na vaga de Dados na Acme."]
+
+
+def test_lote_sem_coluna_dos_campos():
+    with pytest.raises(ValueError, match="nenhuma coluna"):
+        _mensagens("nome;email\nAna;a@x.com\n")
+
+
+@pytest.mark.parametrize("planilha", ["candidato;vaga\n", ""])
+def test_lote_sem_candidatos(planilha):
+    with pytest.raises(ValueError):
+        _mensagens(planilha)
@@ -0,0 +1,45 @@
+from itertools import combinations
+
+from benchmark.gerador import gerar_frases
+from similaridade import NUM_PERMUTACOES, IndiceSimilaridade, assinatura, similaridade
+
+ORIGINAL = "Agradecemos sua participação no processo seletivo, mas seguimos com outro perfil para a vaga."
+
+
+def test_acha_a_quase_duplicada_e_nao_a_diferente():
+    indice = IndiceSimilaridade([
+        {"id": 1, "conteudo": ORIGINAL, "empresa": "Acme"},
+        {"id": 2, "conteudo": "Parabéns! Você foi aprovado para a próxima etapa da entrevista técnica.", "empresa": "Acme"},
+    ])
+    achadas = indice.similares(ORIGINAL.replace("participação", "participacao") + "!", "Acme")
+    assert [i for i, _ in achadas] == [1]
+    assert indice.similares(ORIGINAL, "Acme", excluir=1) == []
+
+
+def test_nome_da_empresa_nao_conta_na_comparacao():
+    assert similaridade(assinatura(f"Olá, a Acme agradece. {ORIGINAL}", "Acme"),
+                        assinatura(f"Olá, a Beta agradece. {ORIGINAL}", "Beta")) == 1.0
+
+
+def test_agrupar_bate_com_a_comparacao_par_a_par():
+    frases = gerar_frases(150)
+    frases += [{**f, "id": f["id"] + 1000, "conteudo": f["conteudo"] + "."} for f in frases[:20]]
+    indice = IndiceSimilaridade(frases)
+    grupos = indice.agrupar()
+    grupo_de = {i: n for n, grupo in enumerate(grupos) for i in grupo}
+    for a, b in combinations(indice.assinaturas, 2):
+        if similaridade(indice.assinaturas[a], indice.assinaturas[b]) >= indice.limiar:
+            assert grupo_de.get(a) is not None and grupo_de.get(a) == grupo_de.get(b)
+    for f in frases[:20]:
+        assert grupo_de.get(f["id"]) == grupo_de.get(f["id"] + 1000)
+
+
+def test_remover_e_readicionar():
+    indice = IndiceSimilaridade([{"id": 1, "conteudo": ORIGINAL}])
+    indice.remover(1)
+    assert indice.similares(ORIGINAL) == []
+    assert not any(indice._faixas)
+    indice.adicionar({"id": 1, "conteudo": ORIGINAL})
+    indice.adicionar({"id": 1, "conteudo": ORIGINAL})
+    assert indice.similares(ORIGINAL) == [(1, 1.0)]
+    assert len(indice.assinaturas[1]) == NUM_PERMUTACOES
@@ -0,0 +1,150 @@
+"""Telemetria de uso das frases (cópias e visualizações) e ranking de popularidade.
+
+`registrar` só soma o evento em contadores por frase na memória; uma thread de
+fundo envia esses totais a cada `intervalo_envio` segundos numa única chamada
+RPC. No banco fica uma linha já agregada por frase, atualizada por soma:
+
+    create table if not exists frases_uso (
+        frase_id bigint primary key references frases(id) on delete cascade,
+        copias bigint not null default 0,
+        visualizacoes bigint not null default 0,
+        pontuacao double precision not null default 0,
+        atualizado_em timestamptz not null default now()
+    );
+    create index if not exists frases_uso_atualizado_em on frases_uso (atualizado_em);
+
+    create or replace function registrar_uso(eventos jsonb) returns void as $$
+        insert into frases_uso as u (frase_id, copias, visualizacoes, pontuacao)
+        select (e->>'frase_id')::bigint, (e->>'copias')::bigint, (e->>'visualizacoes')::bigint, (e->>'pontuacao')::float8
+        from jsonb_array_elements(eventos) e
+        where exists (select 1 from frases f where f.id = (e->>'frase_id')::bigint)
+        on conflict (frase_id) do update set
+            copias = u.copias + excluded.copias,
+            visualizacoes = u.visualizacoes + excluded.visualizacoes,
+            pontuacao = u.pontuacao + excluded.pontuacao,
+            atualizado_em = now();
+    $$ language sql;
+
+O decaimento no tempo não exige regravar nada: cada evento entra com peso
+`2 ** ((t - EPOCA) / meia-vida)`, então um uso de hoje vale o dobro de um de
+`MEIA_VIDA_DIAS` atrás e a ordem das somas é a mesma da pontuação decaída
+(`decair` converte para a escala de hoje; com meia-vida de 14 dias o float64
+só estoura daqui a ~39 anos, basta mover `EPOCA`). Os workers leem só as
+linhas com `atualizado_em` novo. Sem a tabela, o ranking fica só na memória
+do processo.
+"""
+import atexit
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+
+from corpus import paginar_por_marca
+
+MEIA_VIDA_DIAS = 14
+EPOCA = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+PESOS = {"copia": 1.0, "visualizacao": 0.1}
+INTERVALO_ENVIO = 10.0
+INTERVALO_SYNC = 60
+# Com tantas frases diferentes pendentes, envia antes do intervalo.
+MAX_PENDENTES = 500
+
+
+def _escala(quando):
+    return 2 ** ((quando - EPOCA) / (MEIA_VIDA_DIAS * 86400))
+
+
+def decair(pontuacao, agora=None):
+    """Pontuação acumulada na escala de hoje (cópias "equivalentes" recentes)."""
+    return pontuacao / _escala(agora or time.time())
+
+
+class RegistroUso:
+    def __init__(self, cliente, intervalo_envio=INTERVALO_ENVIO, intervalo_sync=INTERVALO_SYNC):
+        self.cliente = cliente
+        self.intervalo_envio = intervalo_envio
+        self.intervalo_sync = intervalo_sync
+        # Valores do banco somados aos eventos locais ainda não enviados.
+        self.pontuacao = {}
+        self.contagens = {}
+        self.enviados = 0
+        self.marca = None
+        self.ultima_sync = 0.0
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._envio = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="uso", daemon=True)
+        self._thread.start()
+        atexit.register(self.descarregar)
+
+    @property
+    def pendentes(self):
+        return len(self._pendentes)
+
+    def registrar(self, frase_id, tipo="copia"):
+        pontos = PESOS[tipo] * _escala(time.time())
+        i = 0 if tipo == "copia" else 1
+        with self._lock:
+            pendente = self._pendentes.setdefault(frase_id, [0, 0, 0.0])
+            pendente[i] += 1
+            pendente[2] += pontos
+            self.contagens.setdefault(frase_id, [0, 0])[i] += 1
+            self.pontuacao[frase_id] = self.pontuacao.get(frase_id, 0.0) + pontos
+            if len(self._pendentes) >= MAX_PENDENTES:
+                self._acordar.set()
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.intervalo_envio)
+            self._acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        """Envia os totais pendentes numa única chamada; em caso de falha, ficam para a próxima."""
+        with self._envio:
+            with self._lock:
+                lote, self._pendentes = self._pendentes, {}
+            if not lote:
+                return
+            eventos = [{"frase_id": i, "copias": c, "visualizacoes": v, "pontuacao": p} for i, (c, v, p) in lote.items()]
+            try:
+                self.cliente.rpc("registrar_uso", {"eventos": eventos}).execute()
+                self.enviados += len(eventos)
+            except Exception:
+                with self._lock:
+                    for frase_id, (c, v, p) in lote.items():
+                        pendente = self._pendentes.setdefault(frase_id, [0, 0, 0.0])
+                        pendente[0] += c
+                        pendente[1] += v
+                        pendente[2] += p
+
+    def sincronizar(self, forcar=False):
+        """Traz do banco só as linhas alteradas desde a última marca (de todas as réplicas)."""
+        # Trava de envio: um lote a caminho não pode ficar fora do banco e dos pendentes ao mesmo tempo.
+        with self._envio:
+            if not forcar and self.ultima_sync and time.monotonic() - self.ultima_sync < self.intervalo_sync:
+                return False
+            marca = self.marca
+
+            def montar():
+                query = self.cliente.table("frases_uso").select(
+                    "frase_id, copias, visualizacoes, pontuacao, atualizado_em")
+                return query.gte("atualizado_em", marca) if marca else query
+            try:
+                linhas = list(paginar_por_marca(montar, "atualizado_em", "frase_id"))
+            finally:
+                self.ultima_sync = time.monotonic()
+            with self._lock:
+                for linha in linhas:
+                    c, v, p = self._pendentes.get(linha["frase_id"], (0, 0, 0.0))
+                    self.pontuacao[linha["frase_id"]] = linha["pontuacao"] + p
+                    self.contagens[linha["frase_id"]] = [linha["copias"] + c, linha["visualizacoes"] + v]
+                    self.marca = max(self.marca or "", linha["atualizado_em"])
+            return bool(linhas)
+
+    def mais_usadas(self, n, frases):
+        """Ids das `n` frases de maior pontuação entre as que ainda existem em `frases`."""
+        with self._lock:
+            candidatos = [(p, i) for i, p in self.pontuacao.items() if i in frases]
+        return [i for _, i in heapq.nlargest(n, candidatos)]